@@ -0,0 +1,51 @@
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Calculate the edit distance (Levenshtein distance) between two strings, if it is less than limit.
+    Otherwise, return limit. Only a band of width 2 * limit around the diagonal of the dynamic programming matrix is
+    computed (Ukkonen), and the computation stops as soon as the limit is exceeded, so this takes O(limit * len(a)).
+    """
+
+    if limit <= 0:
+        return 0
+
+    if len(a) > len(b):
+        a, b = b, a
+
+    # common prefixes and suffixes do not change the edit distance
+    start = 0
+    while start < len(a) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    stop_a, stop_b = len(a) - end, len(b) - end
+    a, b = a[start:stop_a], b[start:stop_b]
+
+    n, m = len(a), len(b)
+    if m - n >= limit:
+        return limit
+    if not n:
+        return m
+
+    # maximum distance of interest
+    k = limit - 1
+    # prev[j] and cur[j] contain the edit distance between a[:i] and b[:j] (or limit if it is at least limit)
+    prev = [j if j <= k else limit for j in range(m + 1)]
+    cur = [limit] * (m + 1)
+    for i in range(1, n + 1):
+        lo, hi = max(1, i - k), min(m, i + k)
+        cur[lo - 1] = i if lo == 1 and i <= k else limit
+        char = a[i - 1]
+        best = cur[lo - 1]
+        for j in range(lo, hi + 1):
+            value = min(prev[j - 1] + (char != b[j - 1]), prev[j] + 1, cur[j - 1] + 1)
+            cur[j] = value
+            if value < best:
+                best = value
+
+        if best >= limit:
+            return limit
+
+        prev, cur = cur, prev
+
+    return min(prev[m], limit)
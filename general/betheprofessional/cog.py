@@ -10,12 +10,13 @@ from PyDrocsid.command import reply
 from PyDrocsid.database import db, select
 from PyDrocsid.embeds import send_long_embed
 from PyDrocsid.translations import t
-from PyDrocsid.util import calculate_edit_distance, check_role_assignable
+from PyDrocsid.util import check_role_assignable
 
 from .colors import Colors
 from .models import BTPRole
 from .permissions import BeTheProfessionalPermission
 from ...contributor import Contributor
+from ...edit_distance import bounded_edit_distance
 from ...pubsub import send_to_changelog
 
 
@@ -40,11 +41,12 @@ async def parse_topics(guild: Guild, topics: str, author: Member) -> List[Role]:
         else:
             if all_topics:
 
-                def dist(name: str) -> int:
-                    return calculate_edit_distance(name.lower(), topic.lower())
-
-                best_dist, best_match = min((dist(r.name), r.name) for r in all_topics)
-                if best_dist <= 5:
+                # suggest the closest topic with an edit distance of at most 5
+                best_dist, best_match = 6, None
+                for name in sorted(r.name for r in all_topics):
+                    if (dist := bounded_edit_distance(name.lower(), topic.lower(), best_dist)) < best_dist:
+                        best_dist, best_match = dist, name
+                if best_match is not None:
                     raise CommandError(t.topic_not_found_did_you_mean(topic, best_match))
 
             raise CommandError(t.topic_not_found(topic))
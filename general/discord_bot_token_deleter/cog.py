@@ -1,7 +1,3 @@
-import base64
-import binascii
-import re
-
 from aiohttp import ClientSession
 from discord import Embed, Forbidden, Message
 
@@ -10,6 +6,7 @@ from PyDrocsid.material_colors import MaterialColors
 from PyDrocsid.translations import t
 
 from ...contributor import Contributor
+from ...message_analysis import analyze
 from ...pubsub import send_alert
 
 
@@ -19,7 +16,6 @@ t = t.discord_bot_token_deleter
 
 class DiscordBotTokenDeleterCog(Cog, name="Discord Bot Token Deleter"):
     CONTRIBUTORS = [Contributor.Tert0, Contributor.Defelo]
-    RE_DC_TOKEN = re.compile(r"([A-Za-z\d\-_]+)\.[A-Za-z\d\-_]+\.[A-Za-z\d\-_]+")
 
     async def on_message(self, message: Message):
         """Delete a message if it contains a Discord bot token"""
@@ -27,15 +23,9 @@ class DiscordBotTokenDeleterCog(Cog, name="Discord Bot Token Deleter"):
         if message.author.id == self.bot.user.id or not message.guild:
             return
 
-        for match in self.RE_DC_TOKEN.finditer(message.content):
-            try:
-                if not base64.urlsafe_b64decode(match.group(1)).isdigit():
-                    continue
-            except binascii.Error:
-                continue
-
+        for token in analyze(message).token_candidates:
             async with ClientSession() as session, session.get(
-                "https://discord.com/api/users/@me", headers={"Authorization": f"Bot {match.group(0)}"}
+                "https://discord.com/api/users/@me", headers={"Authorization": f"Bot {token}"}
             ) as response:
                 if response.ok:
                     break
@@ -33,7 +33,7 @@ from discord.utils import format_dt, utcnow
 from PyDrocsid.async_thread import GatherAnyError, gather_any
 from PyDrocsid.cog import Cog
 from PyDrocsid.command import Confirmation, docs, optional_permissions, reply
-from PyDrocsid.database import db, db_context, db_wrapper, delete, filter_by, select
+from PyDrocsid.database import db_context, db_wrapper
 from PyDrocsid.embeds import send_long_embed
 from PyDrocsid.emojis import name_to_emoji
 from PyDrocsid.multilock import MultiLock
@@ -44,8 +44,8 @@ from PyDrocsid.translations import t
 from PyDrocsid.util import check_role_assignable, send_editable_log
 
 from .colors import Colors
-from .models import DynChannel, DynChannelMember, DynGroup, RoleVoiceLink
 from .permissions import VoiceChannelPermission
+from .state import DynChannelMemberState, DynChannelState, DynGroupState, dyn_voice
 from ...contributor import Contributor
 from ...pubsub import send_alert, send_to_changelog
 
@@ -75,10 +75,9 @@ def check_voice_permissions(voice_channel: VoiceChannel, role: Role) -> bool:
     return view_channel and connect
 
 
-async def collect_links(guild: Guild, link_set, channel_id):
-    link: RoleVoiceLink
-    async for link in await db.stream(filter_by(RoleVoiceLink, voice_channel=channel_id)):
-        if role := guild.get_role(link.role):
+def collect_links(guild: Guild, link_set, channel_id):
+    for role_id in dyn_voice.get_links(channel_id):
+        if role := guild.get_role(role_id):
             link_set.add(role)
 
 
@@ -118,12 +117,12 @@ async def rename_channel(channel: Union[TextChannel, VoiceChannel], name: str):
         raise CommandError(t.rename_rate_limit)
 
 
-def get_user_role(guild: Guild, channel: DynChannel) -> Optional[Role]:
+def get_user_role(guild: Guild, channel: DynChannelState) -> Optional[Role]:
     return guild.get_role(channel.group.user_role)
 
 
 def remove_lock_overrides(
-    channel: DynChannel,
+    channel: DynChannelState,
     voice_channel: VoiceChannel,
     overwrites: Overwrites,
     *,
@@ -146,7 +145,7 @@ def remove_lock_overrides(
 
 
 async def safe_create_voice_channel(
-    category: Union[CategoryChannel, Guild], channel: DynChannel, name: str, overwrites: Overwrites
+    category: Union[CategoryChannel, Guild], channel: DynChannelState, name: str, overwrites: Overwrites
 ) -> VoiceChannel:
     guild: Guild = category.guild if isinstance(category, CategoryChannel) else category
     user_role: Role = get_user_role(guild, channel)
@@ -167,7 +166,7 @@ async def safe_create_voice_channel(
 
 
 class ControlMessage(View):
-    def __init__(self, cog: VoiceChannelCog, channel: DynChannel, message: Message):
+    def __init__(self, cog: VoiceChannelCog, channel: DynChannelState, message: Message):
         super().__init__(timeout=None)
         self.cog = cog
         self.channel = channel
@@ -181,8 +180,8 @@ class ControlMessage(View):
         self.children[3].label = t.buttons["show" if hidden else "hide"]
         self.children[3].emoji = name_to_emoji["eye" if hidden else "man_detective"]
 
-    async def update(self):
-        self.channel = await DynChannel.get(channel_id=self.channel.channel_id)
+    def update(self):
+        self.channel = dyn_voice.get(self.channel.channel_id)
 
     def get_status(self):
         voice_channel: VoiceChannel = self.cog.bot.get_channel(self.channel.channel_id)
@@ -203,7 +202,7 @@ class ControlMessage(View):
     @ui.button()
     @db_wrapper
     async def lock(self, _, interaction: Interaction):
-        await self.update()
+        self.update()
         try:
             await self.cog.check_authorization(self.channel, interaction.user)
         except CommandError:
@@ -219,7 +218,7 @@ class ControlMessage(View):
     @ui.button()
     @db_wrapper
     async def hide(self, _, interaction: Interaction):
-        await self.update()
+        self.update()
         try:
             await self.cog.check_authorization(self.channel, interaction.user)
         except CommandError:
@@ -307,20 +306,20 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
             if (team_role := member.guild.get_role(await RoleSettings.get(role_name))) is not None
         )
 
-    def get_text_channel(self, channel: DynChannel) -> TextChannel:
+    def get_text_channel(self, channel: DynChannelState) -> TextChannel:
         if text_channel := self.bot.get_channel(channel.text_id):
             return text_channel
 
         raise CommandError(t.no_text_channel(f"<#{channel.channel_id}>"))
 
-    async def get_owner(self, channel: DynChannel) -> Optional[Member]:
+    async def get_owner(self, channel: DynChannelState) -> Optional[Member]:
         if out := self._owners.get(channel.channel_id):
             return out
 
         self._owners[channel.channel_id] = await self.fetch_owner(channel)
         return self._owners[channel.channel_id]
 
-    async def update_owner(self, channel: DynChannel, new_owner: Optional[Member]) -> Optional[Member]:
+    async def update_owner(self, channel: DynChannelState, new_owner: Optional[Member]) -> Optional[Member]:
         old_owner: Optional[Member] = self._owners.get(channel.channel_id)
 
         if not new_owner:
@@ -331,7 +330,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
         return new_owner
 
-    async def send_voice_msg(self, channel: DynChannel, title: str, msg: str, force_new_embed: bool = False):
+    async def send_voice_msg(self, channel: DynChannelState, title: str, msg: str, force_new_embed: bool = False):
         try:
             text_channel: TextChannel = self.get_text_channel(channel)
         except CommandError as e:
@@ -356,7 +355,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
         await self.update_control_message(channel, message)
 
-    async def update_control_message(self, channel: DynChannel, message: Message):
+    async def update_control_message(self, channel: DynChannelState, message: Message):
         async def clear_view(msg_id):
             try:
                 await (await message.channel.fetch_message(msg_id)).edit(view=None)
@@ -372,7 +371,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
         await message.edit(view=ControlMessage(self, channel, message))
 
-    async def fix_owner(self, channel: DynChannel) -> Optional[Member]:
+    async def fix_owner(self, channel: DynChannelState) -> Optional[Member]:
         voice_channel: VoiceChannel = self.bot.get_channel(channel.channel_id)
 
         in_voice = {m.id for m in voice_channel.members}
@@ -382,25 +381,25 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                 if member.bot:
                     continue
 
-                channel.owner_id = m.id
+                await dyn_voice.set_owner(channel, m.id)
                 return await self.update_owner(channel, member)
 
-        channel.owner_id = None
+        await dyn_voice.set_owner(channel, None)
         return await self.update_owner(channel, None)
 
-    async def fetch_owner(self, channel: DynChannel) -> Optional[Member]:
+    async def fetch_owner(self, channel: DynChannelState) -> Optional[Member]:
         voice_channel: VoiceChannel = self.bot.get_channel(channel.channel_id)
 
         if channel.owner_override and any(channel.owner_override == member.id for member in voice_channel.members):
             return voice_channel.guild.get_member(channel.owner_override)
 
-        owner: Optional[DynChannelMember] = await db.get(DynChannelMember, id=channel.owner_id)
+        owner: Optional[DynChannelMemberState] = channel.get_member_by_id(channel.owner_id)
         if owner and any(owner.member_id == member.id for member in voice_channel.members):
             return voice_channel.guild.get_member(owner.member_id)
 
         return await self.fix_owner(channel)
 
-    async def check_authorization(self, channel: DynChannel, member: Member):
+    async def check_authorization(self, channel: DynChannelState, member: Member):
         if await VoiceChannelPermission.override_owner.check_permissions(member):
             return
 
@@ -411,14 +410,12 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
     async def get_channel(
         self, member: Member, *, check_owner: bool, check_locked: bool = False
-    ) -> tuple[DynChannel, VoiceChannel]:
+    ) -> tuple[DynChannelState, VoiceChannel]:
         if member.voice is None or member.voice.channel is None:
             raise CommandError(t.not_in_voice)
 
         voice_channel: VoiceChannel = member.voice.channel
-        channel: Optional[DynChannel] = await db.get(
-            DynChannel, [DynChannel.group, DynGroup.channels], DynChannel.members, channel_id=voice_channel.id
-        )
+        channel: Optional[DynChannelState] = dyn_voice.get(voice_channel.id)
         if not channel:
             raise CommandError(t.not_in_voice)
 
@@ -433,25 +430,26 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
     async def on_ready(self):
         guild: Guild = self.bot.guilds[0]
 
+        await dyn_voice.load()
+
         role_voice_links: dict[Role, list[VoiceChannel]] = {}
 
-        link: RoleVoiceLink
-        async for link in await db.stream(select(RoleVoiceLink)):
-            role: Optional[Role] = guild.get_role(link.role)
+        for role_id, voice_id in dyn_voice.links():
+            role: Optional[Role] = guild.get_role(role_id)
             if role is None:
-                await db.delete(link)
+                await dyn_voice.remove_link(role_id, voice_id)
                 continue
 
-            if link.voice_channel.isnumeric():
-                voice: Optional[VoiceChannel] = guild.get_channel(int(link.voice_channel))
+            if voice_id.isnumeric():
+                voice: Optional[VoiceChannel] = guild.get_channel(int(voice_id))
                 if not voice:
-                    await db.delete(link)
+                    await dyn_voice.remove_link(role_id, voice_id)
                 else:
                     role_voice_links.setdefault(role, []).append(voice)
             else:
-                group: Optional[DynGroup] = await db.get(DynGroup, DynGroup.channels, id=link.voice_channel)
+                group: Optional[DynGroupState] = dyn_voice.get_group(voice_id)
                 if not group:
-                    await db.delete(link)
+                    await dyn_voice.remove_link(role_id, voice_id)
                     continue
 
                 for channel in group.channels:
@@ -483,19 +481,17 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
     async def vc_loop(self):
         guild: Guild = self.bot.guilds[0]
 
-        channel: DynChannel
-        async for channel in await db.stream(select(DynChannel)):
+        for channel in dyn_voice.channels():
             voice_channel: Optional[VoiceChannel] = guild.get_channel(channel.channel_id)
             if not voice_channel:
-                await db.delete(channel)
+                await dyn_voice.remove_channel(channel)
                 continue
 
             if not voice_channel.members:
                 asyncio.create_task(voice_channel.edit(name=await self.get_channel_name(guild)))
 
-    async def lock_channel(self, member: Member, channel: DynChannel, voice_channel: VoiceChannel, *, hide: bool):
+    async def lock_channel(self, member: Member, channel: DynChannelState, voice_channel: VoiceChannel, *, hide: bool):
         locked = channel.locked
-        channel.locked = True
         member_overwrites = [
             (member, PermissionOverwrite(view_channel=True, connect=True)) for member in voice_channel.members
         ]
@@ -513,6 +509,8 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         except Forbidden:
             raise CommandError(t.could_not_overwrite_permissions(voice_channel.mention))
 
+        await dyn_voice.set_locked(channel, True)
+
         text_channel = self.get_text_channel(channel)
         try:
             await text_channel.edit(overwrites=merge_permission_overwrites(text_channel.overwrites, *member_overwrites))
@@ -525,9 +523,13 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
             await self.send_voice_msg(channel, t.voice_channel, t.locked(member.mention), force_new_embed=True)
 
     async def unlock_channel(
-        self, member: Optional[Member], channel: DynChannel, voice_channel: VoiceChannel, *, skip_text: bool = False
+        self,
+        member: Optional[Member],
+        channel: DynChannelState,
+        voice_channel: VoiceChannel,
+        *,
+        skip_text: bool = False,
     ):
-        channel.locked = False
         overwrites = remove_lock_overrides(
             channel, voice_channel, voice_channel.overwrites, keep_members=False, reset_user_role=True
         )
@@ -537,6 +539,8 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         except Forbidden:
             raise CommandError(t.could_not_overwrite_permissions(voice_channel.mention))
 
+        await dyn_voice.set_locked(channel, False)
+
         if skip_text:
             return
 
@@ -552,7 +556,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
         await self.send_voice_msg(channel, t.voice_channel, t.unlocked(member.mention), force_new_embed=True)
 
-    async def unhide_channel(self, member: Member, channel: DynChannel, voice_channel: VoiceChannel):
+    async def unhide_channel(self, member: Member, channel: DynChannelState, voice_channel: VoiceChannel):
         user_role = voice_channel.guild.get_role(channel.group.user_role)
 
         try:
@@ -562,7 +566,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
         await self.send_voice_msg(channel, t.voice_channel, t.visible(member.mention))
 
-    async def add_to_channel(self, channel: DynChannel, voice_channel: VoiceChannel, member: Member):
+    async def add_to_channel(self, channel: DynChannelState, voice_channel: VoiceChannel, member: Member):
         overwrite = PermissionOverwrite(view_channel=True, connect=True)
         try:
             await voice_channel.set_permissions(member, overwrite=overwrite)
@@ -577,7 +581,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
         await self.send_voice_msg(channel, t.voice_channel, t.user_added(member.mention))
 
-    async def remove_from_channel(self, channel: DynChannel, voice_channel: VoiceChannel, member: Member):
+    async def remove_from_channel(self, channel: DynChannelState, voice_channel: VoiceChannel, member: Member):
         try:
             await voice_channel.set_permissions(member, overwrite=None)
         except Forbidden:
@@ -589,7 +593,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         except Forbidden:
             raise CommandError(t.could_not_overwrite_permissions(text_channel.mention))
 
-        await db.exec(delete(DynChannelMember).filter_by(channel_id=voice_channel.id, member_id=member.id))
+        await dyn_voice.remove_member(channel, member.id)
         is_owner = member == await self.get_owner(channel)
         if member.voice and member.voice.channel == voice_channel:
             try:
@@ -605,7 +609,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
             await self.fix_owner(channel)
 
     async def member_join(self, member: Member, voice_channel: VoiceChannel):
-        channel: Optional[DynChannel] = await DynChannel.get(channel_id=voice_channel.id)
+        channel: Optional[DynChannelState] = dyn_voice.get(voice_channel.id)
         if not channel:
             return
 
@@ -631,7 +635,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                 await send_alert(voice_channel.guild, t.could_not_create_text_channel(voice_channel.mention))
                 return
 
-            channel.text_id = text_channel.id
+            await dyn_voice.set_text_channel(channel, text_channel.id)
             await text_channel.send(embed=await get_commands_embed())
             await self.send_voice_msg(channel, t.voice_channel, t.dyn_voice_created(member.mention))
 
@@ -648,17 +652,13 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
             except CommandError as e:
                 await send_alert(voice_channel.guild, *e.args)
 
-        channel_member: Optional[DynChannelMember] = await db.get(
-            DynChannelMember, member_id=member.id, channel_id=voice_channel.id
-        )
-        if not channel_member:
-            channel.members.append(channel_member := await DynChannelMember.create(member.id, voice_channel.id))
+        channel_member: DynChannelMemberState = await dyn_voice.add_member(channel, member.id)
 
-        owner: Optional[DynChannelMember] = await db.get(DynChannelMember, id=channel.owner_id)
+        owner: Optional[DynChannelMemberState] = channel.get_member_by_id(channel.owner_id)
         update_owner = False
         if (not owner or channel_member.timestamp < owner.timestamp) and channel.owner_id != channel_member.id:
             if not member.bot:
-                channel.owner_id = channel_member.id
+                await dyn_voice.set_owner(channel, channel_member.id)
                 update_owner = True
         if update_owner or channel.owner_override == member.id:
             await self.update_owner(channel, await self.fetch_owner(channel))
@@ -676,10 +676,10 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
             except (Forbidden, HTTPException):
                 await send_alert(voice_channel.guild, t.could_not_create_voice_channel)
             else:
-                await DynChannel.create(new_channel.id, channel.group_id)
+                await dyn_voice.create_channel(channel.group, new_channel.id)
 
     async def member_leave(self, member: Member, voice_channel: VoiceChannel):
-        channel: Optional[DynChannel] = await DynChannel.get(channel_id=voice_channel.id)
+        channel: Optional[DynChannelState] = dyn_voice.get(voice_channel.id)
         if not channel:
             return
 
@@ -696,7 +696,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         if text_channel:
             await self.send_voice_msg(channel, t.voice_channel, t.dyn_voice_left(member.mention))
 
-        owner: Optional[DynChannelMember] = await db.get(DynChannelMember, id=channel.owner_id)
+        owner: Optional[DynChannelMemberState] = channel.get_member_by_id(channel.owner_id)
         if owner and owner.member_id == member.id or channel.owner_override == member.id:
             await self.fix_owner(channel)
 
@@ -712,10 +712,9 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                     return
 
         async def delete_voice():
-            channel.owner_id = None
-            channel.owner_override = None
-            await db.exec(delete(DynChannelMember).filter_by(channel_id=voice_channel.id))
-            channel.members.clear()
+            await dyn_voice.set_owner(channel, None)
+            await dyn_voice.set_owner_override(channel, None)
+            await dyn_voice.clear_members(channel)
 
             try:
                 await voice_channel.delete()
@@ -723,7 +722,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                 await send_alert(voice_channel.guild, t.could_not_delete_channel(voice_channel.mention))
                 return
             else:
-                await db.delete(channel)
+                await dyn_voice.remove_channel(channel)
 
         async def create_new_channel() -> bool:
             # check if there is at least one empty channel
@@ -750,7 +749,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                 await send_alert(guild, t.could_not_create_voice_channel)
                 return False
             else:
-                await DynChannel.create(new_channel.id, channel.group_id)
+                await dyn_voice.create_channel(channel.group, new_channel.id)
                 return True
 
         await delete_text()
@@ -769,11 +768,11 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                     return await func(*args)
 
         async def create_task(delay, c, task_dict, cancel_dict, func):
-            dyn_channel: Optional[DynChannel] = await DynChannel.get(channel_id=channel.id)
+            dyn_channel: Optional[DynChannelState] = dyn_voice.get(channel.id)
             if not dyn_channel:
                 return
 
-            await collect_links(member.guild, roles := set(), dyn_channel.group_id)
+            collect_links(member.guild, roles := set(), dyn_channel.group_id)
             if func == self.member_leave:
                 await update_roles(member, remove=roles)
             else:
@@ -791,7 +790,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         add: set[Role] = set()
 
         if channel := before.channel:
-            await collect_links(channel.guild, remove, str(channel.id))
+            collect_links(channel.guild, remove, str(channel.id))
             if (k := (member, channel)) in self._recent_kicks:
                 self._recent_kicks.remove(k)
                 await self.member_leave(member, channel)
@@ -799,7 +798,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                 await create_task(5, channel, self._leave_tasks, self._join_tasks, self.member_leave)
 
         if channel := after.channel:
-            await collect_links(channel.guild, add, str(channel.id))
+            collect_links(channel.guild, add, str(channel.id))
             await create_task(1, channel, self._join_tasks, self._leave_tasks, self.member_join)
 
         await update_roles(member, add=add, remove=remove)
@@ -822,14 +821,13 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
         embed = Embed(title=t.voice_channel, colour=Colors.Voice)
 
-        group: DynGroup
-        async for group in await db.stream(select(DynGroup, DynGroup.channels)):
+        for group in dyn_voice.groups():
             channels: list[tuple[str, VoiceChannel, Optional[TextChannel]]] = []
-            for channel in group.channels:
+            for channel in [*group.channels]:
                 voice_channel: Optional[VoiceChannel] = ctx.guild.get_channel(channel.channel_id)
                 text_channel: Optional[TextChannel] = ctx.guild.get_channel(channel.text_id)
                 if not voice_channel:
-                    await db.delete(channel)
+                    await dyn_voice.remove_channel(channel)
                     continue
 
                 if channel.locked:
@@ -843,7 +841,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                 channels.append((icon, voice_channel, text_channel))
 
             if not channels:
-                await db.delete(group)
+                await dyn_voice.remove_group(group)
                 continue
 
             embed.add_field(
@@ -866,7 +864,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         if not check_voice_permissions(voice_channel, user_role):
             raise CommandError(t.invalid_user_role(user_role.mention if user_role != everyone else "@everyone"))
 
-        if await db.exists(filter_by(DynChannel, channel_id=voice_channel.id)):
+        if dyn_voice.get(voice_channel.id):
             raise CommandError(t.dyn_group_already_exists)
 
         try:
@@ -874,7 +872,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         except Forbidden:
             raise CommandError(t.cannot_edit)
 
-        await DynGroup.create(voice_channel.id, user_role.id)
+        await dyn_voice.create_group(voice_channel.id, user_role.id)
         embed = Embed(title=t.voice_channel, colour=Colors.Voice, description=t.dyn_group_created)
         await reply(ctx, embed=embed)
         await send_to_changelog(ctx.guild, t.log_dyn_group_created)
@@ -883,9 +881,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
     @VoiceChannelPermission.dyn_write.check
     @docs(t.commands.voice_dynamic_remove)
     async def voice_dynamic_remove(self, ctx: Context, *, voice_channel: VoiceChannel):
-        channel: Optional[DynChannel] = await db.get(
-            DynChannel, [DynChannel.group, DynGroup.channels], DynChannel.members, channel_id=voice_channel.id
-        )
+        channel: Optional[DynChannelState] = dyn_voice.get(voice_channel.id)
         if not channel:
             raise CommandError(t.dyn_group_not_found)
 
@@ -901,7 +897,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                 except Forbidden:
                     raise CommandError(t.could_not_delete_channel(x.mention))
 
-        await db.delete(channel.group)
+        await dyn_voice.remove_group(channel.group)
         embed = Embed(title=t.voice_channel, colour=Colors.Voice, description=t.dyn_group_removed)
         await reply(ctx, embed=embed)
         await send_to_changelog(ctx.guild, t.log_dyn_group_removed)
@@ -911,14 +907,14 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
     async def voice_help(self, ctx: Context):
         message = await reply(ctx, embed=await get_commands_embed())
 
-        if channel := await DynChannel.get(text_id=ctx.channel.id):
+        if channel := dyn_voice.get_by_text(ctx.channel.id):
             await self.update_control_message(channel, message)
 
     @voice.command(name="info", aliases=["i"])
     @docs(t.commands.voice_info)
     async def voice_info(self, ctx: Context, *, voice_channel: Optional[Union[VoiceChannel, Member]] = None):
         if not voice_channel:
-            if channel := await db.get(DynChannel, text_id=ctx.channel.id):
+            if channel := dyn_voice.get_by_text(ctx.channel.id):
                 voice_channel = self.bot.get_channel(channel.channel_id)
 
         if not isinstance(voice_channel, VoiceChannel):
@@ -931,9 +927,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
                 raise CommandError(tg.permission_denied)
             voice_channel = member.voice.channel
 
-        channel: Optional[DynChannel] = await db.get(
-            DynChannel, [DynChannel.group, DynGroup.channels], DynChannel.members, channel_id=voice_channel.id
-        )
+        channel: Optional[DynChannelState] = dyn_voice.get(voice_channel.id)
         if not channel:
             raise CommandError(t.dyn_group_not_found)
 
@@ -942,7 +936,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
         await self.send_voice_info(ctx, channel)
 
-    async def send_voice_info(self, target: Messageable | InteractionResponse, channel: DynChannel):
+    async def send_voice_info(self, target: Messageable | InteractionResponse, channel: DynChannelState):
         voice_channel: VoiceChannel = self.bot.get_channel(channel.channel_id)
         if channel.locked:
             if voice_channel.overwrites_for(voice_channel.guild.get_role(channel.group.user_role)).view_channel:
@@ -983,7 +977,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         messages = await send_long_embed(target, embed, paginate=True)
         if isinstance(target, InteractionResponse):
             return
-        if channel := await DynChannel.get(text_id=channel.text_id):
+        if channel := dyn_voice.get_by_text(channel.text_id):
             await self.update_control_message(channel, messages[-1])
 
     @voice.command(name="rename")
@@ -1029,7 +1023,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         if await self.get_owner(channel) == member:
             raise CommandError(t.already_owner(member.mention))
 
-        channel.owner_override = member.id
+        await dyn_voice.set_owner_override(channel, member.id)
         await self.update_owner(channel, member)
         await ctx.message.add_reaction(name_to_emoji["white_check_mark"])
 
@@ -1141,23 +1135,22 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
         guild: Guild = ctx.guild
 
         out: list[tuple[VoiceChannel, Role]] = []
-        link: RoleVoiceLink
-        async for link in await db.stream(select(RoleVoiceLink)):
-            role: Optional[Role] = guild.get_role(link.role)
+        for role_id, voice_id in dyn_voice.links():
+            role: Optional[Role] = guild.get_role(role_id)
             if role is None:
-                await db.delete(link)
+                await dyn_voice.remove_link(role_id, voice_id)
                 continue
 
-            if link.voice_channel.isnumeric():
-                voice: Optional[VoiceChannel] = guild.get_channel(int(link.voice_channel))
+            if voice_id.isnumeric():
+                voice: Optional[VoiceChannel] = guild.get_channel(int(voice_id))
                 if not voice:
-                    await db.delete(link)
+                    await dyn_voice.remove_link(role_id, voice_id)
                     continue
                 out.append((voice, role))
             else:
-                group: Optional[DynGroup] = await db.get(DynGroup, DynGroup.channels, id=link.voice_channel)
+                group: Optional[DynGroupState] = dyn_voice.get_group(voice_id)
                 if not group:
-                    await db.delete(link)
+                    await dyn_voice.remove_link(role_id, voice_id)
                     continue
 
                 for channel in group.channels:
@@ -1175,7 +1168,7 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
 
         await send_long_embed(ctx, embed)
 
-    def gather_members(self, channel: Optional[DynChannel], voice_channel: VoiceChannel) -> set[Member]:
+    def gather_members(self, channel: Optional[DynChannelState], voice_channel: VoiceChannel) -> set[Member]:
         members: set[Member] = set(voice_channel.members)
         if not channel:
             return members
@@ -1190,17 +1183,17 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
     @VoiceChannelPermission.link_write.check
     @docs(t.commands.voice_link_add)
     async def voice_link_add(self, ctx: Context, voice_channel: VoiceChannel, *, role: Role):
-        if channel := await DynChannel.get(channel_id=voice_channel.id):
+        if channel := dyn_voice.get(voice_channel.id):
             voice_id = channel.group_id
         else:
             voice_id = str(voice_channel.id)
 
-        if await db.exists(filter_by(RoleVoiceLink, role=role.id, voice_channel=voice_id)):
+        if dyn_voice.link_exists(role.id, voice_id):
             raise CommandError(t.link_already_exists)
 
         check_role_assignable(role)
 
-        await RoleVoiceLink.create(role.id, voice_id)
+        await dyn_voice.add_link(role.id, voice_id)
 
         for m in self.gather_members(channel, voice_channel):
             asyncio.create_task(update_roles(m, add={role}))
@@ -1213,16 +1206,15 @@ class VoiceChannelCog(Cog, name="Voice Channels"):
     @VoiceChannelPermission.link_write.check
     @docs(t.commands.voice_link_remove)
     async def voice_link_remove(self, ctx: Context, voice_channel: VoiceChannel, *, role: Role):
-        if channel := await DynChannel.get(channel_id=voice_channel.id):
+        if channel := dyn_voice.get(voice_channel.id):
             voice_id = channel.group_id
         else:
             voice_id = str(voice_channel.id)
 
-        link: Optional[RoleVoiceLink] = await db.get(RoleVoiceLink, role=role.id, voice_channel=voice_id)
-        if not link:
+        if not dyn_voice.link_exists(role.id, voice_id):
             raise CommandError(t.link_not_found)
 
-        await db.delete(link)
+        await dyn_voice.remove_link(role.id, voice_id)
 
         for m in self.gather_members(channel, voice_channel):
             asyncio.create_task(update_roles(m, remove={role}))
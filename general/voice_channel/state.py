@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, NamedTuple, Optional, Union
+
+from sqlalchemy import update
+
+from PyDrocsid.database import db, delete, select
+
+from .models import DynChannel, DynChannelMember, DynGroup, RoleVoiceLink
+
+
+class DynChannelMemberState(NamedTuple):
+    id: str
+    member_id: int
+    timestamp: datetime
+
+
+class DynGroupState:
+    def __init__(self, group_id: str, user_role: int):
+        self.id: str = group_id
+        self.user_role: int = user_role
+        self.channels: list[DynChannelState] = []
+
+
+class DynChannelState:
+    def __init__(
+        self,
+        channel_id: int,
+        text_id: Optional[int],
+        locked: bool,
+        group: DynGroupState,
+        owner_id: Optional[str],
+        owner_override: Optional[int],
+    ):
+        self.channel_id: int = channel_id
+        self.text_id: Optional[int] = text_id
+        self.locked: bool = locked
+        self.group: DynGroupState = group
+        self.owner_id: Optional[str] = owner_id
+        self.owner_override: Optional[int] = owner_override
+        # ordered by join timestamp
+        self.members: list[DynChannelMemberState] = []
+
+    @property
+    def group_id(self) -> str:
+        return self.group.id
+
+    def get_member(self, member_id: int) -> Optional[DynChannelMemberState]:
+        return next((m for m in self.members if m.member_id == member_id), None)
+
+    def get_member_by_id(self, channel_member_id: Optional[str]) -> Optional[DynChannelMemberState]:
+        return next((m for m in self.members if m.id == channel_member_id), None)
+
+
+class DynVoiceState:
+    """
+    In-memory model of all dynamic voice groups, channels, channel members and role voice links.
+    It is loaded on ready and is the authoritative source for all reads. Every change is applied to the model first
+    and then written through to the database within the session of the caller.
+    """
+
+    def __init__(self):
+        self._groups: dict[str, DynGroupState] = {}
+        self._channels: dict[int, DynChannelState] = {}
+        self._text_channels: dict[int, DynChannelState] = {}
+        # voice channel id (or group id) -> role ids
+        self._links: dict[str, set[int]] = {}
+
+    async def load(self):
+        """Load the model from the database."""
+
+        # build the new model first, so the old model can still be used while the database is queried
+        groups: dict[str, DynGroupState] = {}
+        channels: dict[int, DynChannelState] = {}
+        text_channels: dict[int, DynChannelState] = {}
+        links: dict[str, set[int]] = {}
+
+        group: DynGroup
+        async for group in await db.stream(select(DynGroup)):
+            groups[group.id] = DynGroupState(group.id, group.user_role)
+
+        channel: DynChannel
+        async for channel in await db.stream(select(DynChannel)):
+            if not (group_state := groups.get(channel.group_id)):
+                continue
+
+            state = DynChannelState(
+                channel.channel_id,
+                channel.text_id,
+                channel.locked,
+                group_state,
+                channel.owner_id,
+                channel.owner_override,
+            )
+            group_state.channels.append(state)
+            channels[state.channel_id] = state
+            if state.text_id:
+                text_channels[state.text_id] = state
+
+        member: DynChannelMember
+        async for member in await db.stream(select(DynChannelMember).order_by(DynChannelMember.timestamp)):
+            if channel_state := channels.get(member.channel_id):
+                channel_state.members.append(DynChannelMemberState(member.id, member.member_id, member.timestamp))
+
+        link: RoleVoiceLink
+        async for link in await db.stream(select(RoleVoiceLink)):
+            links.setdefault(link.voice_channel, set()).add(link.role)
+
+        self._groups, self._channels, self._text_channels, self._links = groups, channels, text_channels, links
+
+    def get(self, channel_id: int) -> Optional[DynChannelState]:
+        return self._channels.get(channel_id)
+
+    def get_by_text(self, text_id: int) -> Optional[DynChannelState]:
+        return self._text_channels.get(text_id)
+
+    def get_group(self, group_id: str) -> Optional[DynGroupState]:
+        return self._groups.get(group_id)
+
+    def groups(self) -> list[DynGroupState]:
+        return list(self._groups.values())
+
+    def channels(self) -> list[DynChannelState]:
+        return list(self._channels.values())
+
+    async def create_group(self, channel_id: int, user_role: int) -> DynGroupState:
+        group = await DynGroup.create(channel_id, user_role)
+        self._groups[group.id] = group_state = DynGroupState(group.id, user_role)
+        self._add_channel(group_state, channel_id)
+        return group_state
+
+    async def create_channel(self, group: DynGroupState, channel_id: int) -> DynChannelState:
+        await DynChannel.create(channel_id, group.id)
+        return self._add_channel(group, channel_id)
+
+    def _add_channel(self, group: DynGroupState, channel_id: int) -> DynChannelState:
+        channel = DynChannelState(channel_id, None, False, group, None, None)
+        group.channels.append(channel)
+        self._channels[channel_id] = channel
+        return channel
+
+    async def remove_channel(self, channel: DynChannelState):
+        self._channels.pop(channel.channel_id, None)
+        self._text_channels.pop(channel.text_id, None)
+        if channel in channel.group.channels:
+            channel.group.channels.remove(channel)
+
+        await db.exec(delete(DynChannelMember).filter_by(channel_id=channel.channel_id))
+        await db.exec(delete(DynChannel).filter_by(channel_id=channel.channel_id))
+
+    async def remove_group(self, group: DynGroupState):
+        for channel in [*group.channels]:
+            await self.remove_channel(channel)
+
+        self._groups.pop(group.id, None)
+        await db.exec(delete(DynGroup).filter_by(id=group.id))
+
+    async def _update(self, channel: DynChannelState, **values: Any):
+        for key, value in values.items():
+            setattr(channel, key, value)
+
+        await db.exec(update(DynChannel).filter_by(channel_id=channel.channel_id).values(**values))
+
+    async def set_text_channel(self, channel: DynChannelState, text_id: int):
+        self._text_channels.pop(channel.text_id, None)
+        self._text_channels[text_id] = channel
+        await self._update(channel, text_id=text_id)
+
+    async def set_locked(self, channel: DynChannelState, locked: bool):
+        await self._update(channel, locked=locked)
+
+    async def set_owner(self, channel: DynChannelState, owner_id: Optional[str]):
+        """Set the owner of a channel to the DynChannelMember with the given id."""
+
+        await self._update(channel, owner_id=owner_id)
+
+    async def set_owner_override(self, channel: DynChannelState, member_id: Optional[int]):
+        await self._update(channel, owner_override=member_id)
+
+    async def add_member(self, channel: DynChannelState, member_id: int) -> DynChannelMemberState:
+        """Return the channel member entry of a member, which is created if it does not exist yet."""
+
+        if member := channel.get_member(member_id):
+            return member
+
+        row = await DynChannelMember.create(member_id, channel.channel_id)
+        channel.members.append(member := DynChannelMemberState(row.id, row.member_id, row.timestamp))
+        return member
+
+    async def remove_member(self, channel: DynChannelState, member_id: int):
+        channel.members = [m for m in channel.members if m.member_id != member_id]
+        await db.exec(delete(DynChannelMember).filter_by(channel_id=channel.channel_id, member_id=member_id))
+
+    async def clear_members(self, channel: DynChannelState):
+        channel.members.clear()
+        await db.exec(delete(DynChannelMember).filter_by(channel_id=channel.channel_id))
+
+    def links(self) -> list[tuple[int, str]]:
+        """Return all role voice links as (role id, voice channel id or group id) pairs."""
+
+        return [(role, voice_channel) for voice_channel, roles in self._links.items() for role in roles]
+
+    def get_links(self, voice_channel: Union[int, str]) -> set[int]:
+        """Return the ids of all roles which are linked to a voice channel id or group id."""
+
+        return self._links.get(str(voice_channel), set())
+
+    def link_exists(self, role: int, voice_channel: str) -> bool:
+        return role in self._links.get(voice_channel, set())
+
+    async def add_link(self, role: int, voice_channel: str):
+        self._links.setdefault(voice_channel, set()).add(role)
+        await RoleVoiceLink.create(role, voice_channel)
+
+    async def remove_link(self, role: int, voice_channel: str):
+        self._links.get(voice_channel, set()).discard(role)
+        await db.exec(delete(RoleVoiceLink).filter_by(role=role, voice_channel=voice_channel))
+
+
+dyn_voice = DynVoiceState()
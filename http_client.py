@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+
+T = TypeVar("T")
+
+# maximum number of simultaneous connections (in total and per host) of the shared session
+CONNECTION_LIMIT = 64
+CONNECTION_LIMIT_PER_HOST = 8
+# default timeout (in seconds) for a single request
+REQUEST_TIMEOUT = 10
+
+_session: Optional[ClientSession] = None
+
+
+def get_session() -> ClientSession:
+    """Return the http session (and connection pool) which is shared between all cogs."""
+
+    global _session
+
+    if _session is None or _session.closed:
+        _session = ClientSession(
+            connector=TCPConnector(limit=CONNECTION_LIMIT, limit_per_host=CONNECTION_LIMIT_PER_HOST),
+            timeout=ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+
+    return _session
+
+
+async def gather_with_deadline(
+    func: Callable[[str], Awaitable[Optional[T]]], keys: list[str], deadline: float
+) -> dict[str, T]:
+    """
+    Call an async function for each of the given keys concurrently and collect all results which are available
+    within the deadline (in seconds). Calls which are still pending after the deadline are cancelled, calls which
+    return None or raise an exception are omitted.
+    """
+
+    if not keys:
+        return {}
+
+    tasks = {asyncio.create_task(func(key)): key for key in set(keys)}
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+
+    return {
+        tasks[task]: result
+        for task in done
+        if not task.cancelled() and task.exception() is None and (result := task.result()) is not None
+    }
@@ -1,23 +1,25 @@
 import asyncio
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Union
 
-from discord import Embed, Guild, Member, Message, NotFound, Permissions, Role, Status, TextChannel
+from discord import Embed, Guild, Member, Message, NotFound, Object, Permissions, Role, Status, TextChannel
 from discord.ext import commands
 from discord.ext.commands import CommandError, Context, guild_only, max_concurrency
-from discord.utils import format_dt, utcnow
+from discord.utils import format_dt, snowflake_time, utcnow
 
 from PyDrocsid.async_thread import run_as_task, semaphore_gather
 from PyDrocsid.cog import Cog
 from PyDrocsid.command import optional_permissions, reply
 from PyDrocsid.config import Contributor
-from PyDrocsid.database import db, db_wrapper
+from PyDrocsid.database import db, db_context
 from PyDrocsid.embeds import send_long_embed
 from PyDrocsid.translations import t
 
-from .models import Activity
+from .models import Activity, ActivityScanCheckpoint
 from .permissions import InactivityPermission
 from .settings import InactivitySettings
+from .stats import STATS_RETENTION_DAYS, activity_stats, count_active_users, count_active_users_per_channel
+from .tracker import activity_tracker
 from ...pubsub import get_user_status_entries, ignore_message_edit, send_to_changelog
 
 
@@ -25,6 +27,12 @@ tg = t.g
 t = t.inactivity
 
 
+# number of channels shown in the activity statistics
+STATS_TOP_CHANNELS = 10
+# number of messages after which the collected activity is saved together with the checkpoint of the channel
+SCAN_SAVE_INTERVAL = 1000
+
+
 def status_icon(status: Status) -> str:
     return {
         Status.online: ":green_circle:",
@@ -49,28 +57,59 @@ async def scan(ctx: Context, days: int):
     embed = Embed(title=t.scanning, timestamp=utcnow())
     message: list[Message] = [await reply(ctx, embed=embed)]
     guild: Guild = ctx.guild
-    members: dict[Member, datetime] = {}
-    active: dict[TextChannel, int] = {}
+    cutoff: datetime = utcnow() - timedelta(days=days)
+    members: set[int] = set()
+    active: dict[TextChannel, tuple[int, int]] = {}
     completed: list[TextChannel] = []
+    save_lock = asyncio.Lock()
 
     async def update_progress_message():
         while len(completed) < len(channels):
             content = t.scanning_channel(len(completed), len(channels), cnt=len(active))
-            for a, d in active.items():
-                channel_age = (utcnow() - a.created_at).days
-                content += f"\n:small_orange_diamond: {a.mention} ({d} / {min(channel_age, days)})"
+            for a, (d, total) in active.items():
+                content += f"\n:small_orange_diamond: {a.mention} ({d} / {total})"
             message[0] = await update_msg(message[0], content)
             await asyncio.sleep(2)
 
-    async def update_members(c: TextChannel):
-        active[c] = 0
+    async def save_progress(c: TextChannel, timestamps: dict[int, datetime], last_message_id: int, since: datetime):
+        # the same members are active in multiple channels, so the progress is saved by a single writer at a time
+        # (the upsert in bulk_update also keeps concurrent updates of the activity tracker from conflicting)
+        async with save_lock, db_context():
+            await Activity.bulk_update(timestamps)
+            await ActivityScanCheckpoint.set(c.id, last_message_id, since)
 
-        async for msg in c.history(limit=None, oldest_first=False):
-            s = (utcnow() - msg.created_at).total_seconds()
-            if s > days * 24 * 60 * 60:
-                break
-            members[msg.author] = max(members.get(msg.author, msg.created_at), msg.created_at)
-            active[c] = int(s / (24 * 60 * 60))
+        members.update(timestamps)
+        timestamps.clear()
+
+    async def update_members(c: TextChannel):
+        async with db_context():
+            checkpoint: Optional[ActivityScanCheckpoint] = await ActivityScanCheckpoint.get(c.id)
+
+        # only messages newer than the checkpoint need to be scanned, unless the scanned range does not reach back far
+        # enough (in this case the whole range is scanned again)
+        after: Union[Object, datetime]
+        if checkpoint and checkpoint.since <= cutoff:
+            since, after = checkpoint.since, Object(id=checkpoint.message_id)
+            start = snowflake_time(checkpoint.message_id)
+        else:
+            since, after = cutoff, cutoff
+            start = max(cutoff, c.created_at)
+
+        active[c] = 0, (utcnow() - start).days
+        timestamps: dict[int, datetime] = {}
+        last_message_id: Optional[int] = None
+        count = 0
+        async for msg in c.history(limit=None, after=after, oldest_first=True):
+            # messages are scanned from oldest to newest, so the latest message of each author is stored
+            timestamps[msg.author.id] = msg.created_at
+            last_message_id = msg.id
+            active[c] = (msg.created_at - start).days, active[c][1]
+            count += 1
+            if count % SCAN_SAVE_INTERVAL == 0:
+                await save_progress(c, timestamps, last_message_id, since)
+
+        if last_message_id is not None:
+            await save_progress(c, timestamps, last_message_id, since)
 
         del active[c]
         completed.append(c)
@@ -88,13 +127,7 @@ async def scan(ctx: Context, days: int):
         task.cancel()
 
     await update_msg(message[0], t.scan_complete(cnt=len(guild.text_channels)))
-
-    embed = Embed(title=t.updating_members)
-    message: Message = await reply(ctx, embed=embed)
-
-    await semaphore_gather(50, *[db_wrapper(Activity.update)(m.id, ts) for m, ts in members.items()])
-
-    await update_msg(message, t.updated_members(cnt=len(members)))
+    await reply(ctx, embed=Embed(title=t.updated_members(cnt=len(members))))
 
 
 class InactivityCog(Cog, name="Inactivity"):
@@ -104,11 +137,14 @@ class InactivityCog(Cog, name="Inactivity"):
         if message.guild is None:
             return
 
-        await Activity.update(message.author.id, message.created_at)
+        activity_tracker.update(message.author.id, message.created_at)
 
         role: Role
         for role in message.role_mentions:
-            await Activity.update(role.id, message.created_at)
+            activity_tracker.update(role.id, message.created_at)
+
+        if not message.author.bot:
+            activity_stats.record(message)
 
     @commands.command()
     @InactivityPermission.scan.check
@@ -129,13 +165,14 @@ class InactivityCog(Cog, name="Inactivity"):
         inactive_days = await InactivitySettings.inactive_days.get()
 
         activity: Optional[Activity] = await db.get(Activity, id=user_id)
+        timestamp = activity_tracker.get(user_id, activity and activity.timestamp)
 
-        if activity is None:
+        if timestamp is None:
             status = t.status.inactive
-        elif (utcnow() - activity.timestamp).days >= inactive_days:
-            status = t.status.inactive_since(format_dt(activity.timestamp, style="R"))
+        elif (utcnow() - timestamp).days >= inactive_days:
+            status = t.status.inactive_since(format_dt(timestamp, style="R"))
         else:
-            status = t.status.active(format_dt(activity.timestamp, style="R"))
+            status = t.status.active(format_dt(timestamp, style="R"))
 
         return [(t.activity, status)]
 
@@ -158,17 +195,16 @@ class InactivityCog(Cog, name="Inactivity"):
 
         now = utcnow()
 
-        @db_wrapper
-        async def load_member(m: Member) -> tuple[Member, Optional[datetime]]:
-            ts = await db.get(Activity, id=m.id)
-            return m, ts.timestamp if ts else None
-
         if roles:
             members: set[Member] = {member for role in roles for member in role.members}
         else:
             members: set[Member] = set(ctx.guild.members)
 
-        last_activity: list[tuple[Member, Optional[datetime]]] = await semaphore_gather(50, *map(load_member, members))
+        activities: dict[int, Activity] = await Activity.get_many(member.id for member in members)
+        last_activity: list[tuple[Member, Optional[datetime]]] = []
+        for member in members:
+            activity: Optional[Activity] = activities.get(member.id)
+            last_activity.append((member, activity_tracker.get(member.id, activity and activity.timestamp)))
         last_activity.sort(key=lambda a: (a[1].timestamp() if a[1] else -1, str(a[0])))
 
         out = []
@@ -216,3 +252,45 @@ class InactivityCog(Cog, name="Inactivity"):
         await InactivitySettings.inactive_days.set(days)
         await reply(ctx, t.inactive_duration_set(cnt=days))
         await send_to_changelog(ctx.guild, t.inactive_duration_set(cnt=days))
+
+    @commands.command(aliases=["astats"])
+    @InactivityPermission.read.check
+    @guild_only()
+    async def activity_stats(self, ctx: Context, days: Optional[int], channel: Optional[TextChannel]):
+        """
+        show the number of active users
+        """
+
+        if days is None:
+            days = 30
+        elif days not in range(1, STATS_RETENTION_DAYS + 1):
+            raise CommandError(t.invalid_stats_duration(cnt=STATS_RETENTION_DAYS))
+
+        # include the activity which has not been flushed to redis yet
+        await activity_stats.flush()
+
+        today = utcnow().date()
+        scope, object_id = ("channel", channel.id) if channel else ("guild", ctx.guild.id)
+
+        embed = Embed(title=t.activity_stats, colour=0x256BE6)
+        if channel:
+            embed.description = channel.mention
+        for name, period in [(t.daily_active_users, 1), (t.weekly_active_users, 7), (t.monthly_active_users, 30)]:
+            embed.add_field(name=name, value=str(await count_active_users(scope, object_id, today, period)))
+        embed.add_field(
+            name=t.active_users(cnt=days), value=str(await count_active_users(scope, object_id, today, days))
+        )
+
+        if not channel:
+            channels: dict[int, int] = await count_active_users_per_channel(
+                [c.id for c in ctx.guild.text_channels], today, days
+            )
+            top = sorted(((cnt, c) for c, cnt in channels.items() if cnt), reverse=True)[:STATS_TOP_CHANNELS]
+            if top:
+                embed.add_field(
+                    name=t.most_active_channels,
+                    value="\n".join(f":small_orange_diamond: <#{c}> ({cnt})" for cnt, c in top),
+                    inline=False,
+                )
+
+        await reply(ctx, embed=embed)
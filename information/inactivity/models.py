@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Union
+from typing import Any, Iterable, Optional, Union
 
-from sqlalchemy import BigInteger, Column
+from sqlalchemy import BigInteger, Column, func
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.sql import Insert
 
-from PyDrocsid.database import Base, UTCDateTime, db
+from PyDrocsid.database import Base, UTCDateTime, db, select
+
+
+# maximum number of ids per IN query or rows per upsert
+BULK_CHUNK_SIZE = 1000
 
 
 class Activity(Base):
@@ -21,9 +27,63 @@ class Activity(Base):
         return row
 
     @staticmethod
-    async def update(object_id: int, timestamp: datetime) -> Activity:
-        if not (row := await db.get(Activity, id=object_id)):
-            row = await Activity.create(object_id, timestamp)
-        elif timestamp > row.timestamp:
-            row.timestamp = timestamp
+    async def get_many(object_ids: Iterable[int]) -> dict[int, Activity]:
+        """Return the activity rows of multiple objects with a few chunked IN queries."""
+
+        ids = list(object_ids)
+        rows: dict[int, Activity] = {}
+        while ids:
+            chunk, ids = ids[:BULK_CHUNK_SIZE], ids[BULK_CHUNK_SIZE:]
+            rows.update({row.id: row for row in await db.all(select(Activity).filter(Activity.id.in_(chunk)))})
+        return rows
+
+    @staticmethod
+    async def bulk_update(timestamps: dict[int, datetime]):
+        """
+        Update the timestamps of multiple objects.
+        Rows are upserted in chunks, so concurrent updates of the same objects neither conflict nor move a timestamp
+        backwards.
+        """
+
+        # rows are always written in the same order, so concurrent upserts can't deadlock
+        values = [{"id": object_id, "timestamp": timestamp} for object_id, timestamp in sorted(timestamps.items())]
+        while values:
+            chunk, values = values[:BULK_CHUNK_SIZE], values[BULK_CHUNK_SIZE:]
+            await db.exec(_upsert_activity(chunk))
+
+
+def _upsert_activity(values: list[dict[str, Any]]) -> Insert:
+    if db.engine.dialect.name == "postgresql":
+        statement = postgresql.insert(Activity).values(values)
+        new = statement.excluded.timestamp
+        return statement.on_conflict_do_update(
+            index_elements=[Activity.id], set_={"timestamp": func.greatest(func.coalesce(Activity.timestamp, new), new)}
+        )
+
+    statement = mysql.insert(Activity).values(values)
+    new = statement.inserted.timestamp
+    return statement.on_duplicate_key_update(timestamp=func.greatest(func.coalesce(Activity.timestamp, new), new))
+
+
+class ActivityScanCheckpoint(Base):
+    __tablename__ = "activity_scan_checkpoint"
+
+    channel_id: Union[Column, int] = Column(BigInteger, primary_key=True, unique=True)
+    # id of the newest message which has been scanned
+    message_id: Union[Column, int] = Column(BigInteger)
+    # all messages between this timestamp and message_id have been scanned
+    since: Union[Column, datetime] = Column(UTCDateTime)
+
+    @staticmethod
+    async def get(channel_id: int) -> Optional[ActivityScanCheckpoint]:
+        return await db.get(ActivityScanCheckpoint, channel_id=channel_id)
+
+    @staticmethod
+    async def set(channel_id: int, message_id: int, since: datetime) -> ActivityScanCheckpoint:
+        if not (row := await ActivityScanCheckpoint.get(channel_id)):
+            row = ActivityScanCheckpoint(channel_id=channel_id, message_id=message_id, since=since)
+            await db.add(row)
+        else:
+            row.message_id = message_id
+            row.since = since
         return row
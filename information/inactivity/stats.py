@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+from discord import Message
+
+from PyDrocsid.redis import redis
+
+
+# number of days for which activity statistics are kept
+STATS_RETENTION_DAYS = 90
+
+
+def _key(scope: str, object_id: int, day: date) -> str:
+    return f"activity_stats:{scope}={object_id}:day={day.isoformat()}"
+
+
+def _keys(scope: str, object_id: int, end: date, days: int) -> list[str]:
+    return [_key(scope, object_id, end - timedelta(days=i)) for i in range(days)]
+
+
+class ActivityStats:
+    """
+    Collects the authors of messages in memory and adds them to the daily sets of active users of the guilds and
+    channels with a single redis pipeline per flush.
+    These sets are HyperLogLogs, so they need at most 12 KB each, regardless of the number of users.
+    """
+
+    def __init__(self):
+        # key of the daily set -> user ids
+        self._pending: dict[str, set[int]] = {}
+
+    def record(self, message: Message):
+        """Record the author of a message as active in the guild and the channel of the message."""
+
+        day: date = message.created_at.date()
+        for key in [_key("guild", message.guild.id, day), _key("channel", message.channel.id, day)]:
+            self._pending.setdefault(key, set()).add(message.author.id)
+
+    async def flush(self):
+        """Add all recorded users to the sets in redis."""
+
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        try:
+            async with redis.pipeline() as pipe:
+                for key, user_ids in pending.items():
+                    await pipe.pfadd(key, *user_ids)
+                    await pipe.expire(key, (STATS_RETENTION_DAYS + 1) * 24 * 60 * 60)
+                await pipe.execute()
+        except BaseException:
+            for key, user_ids in pending.items():
+                self._pending.setdefault(key, set()).update(user_ids)
+            raise
+
+
+async def count_active_users(scope: str, object_id: int, end: date, days: int) -> int:
+    """Return the approximate number of users who have been active in a guild or channel in the given days."""
+
+    return await redis.pfcount(*_keys(scope, object_id, end, days))
+
+
+async def count_active_users_per_channel(channel_ids: list[int], end: date, days: int) -> dict[int, int]:
+    """Return the approximate number of active users of multiple channels in the given days."""
+
+    async with redis.pipeline() as pipe:
+        for channel_id in channel_ids:
+            await pipe.pfcount(*_keys("channel", channel_id, end, days))
+        return dict(zip(channel_ids, await pipe.execute()))
+
+
+activity_stats = ActivityStats()
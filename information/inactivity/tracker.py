@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from PyDrocsid.database import db_context
+from PyDrocsid.logger import get_logger
+
+from .models import Activity
+from .stats import activity_stats
+
+
+logger = get_logger(__name__)
+
+# maximum time (in seconds) an activity update is kept in memory before it is written to the database
+FLUSH_INTERVAL = 10
+
+
+class ActivityTracker:
+    """
+    Coalesces activity updates in memory (keeping the latest timestamp per id) and writes them to the database in bulk
+    every FLUSH_INTERVAL seconds and when the background task is cancelled on shutdown.
+    The activity statistics recorded in the meantime are flushed to redis together with the activity updates.
+    """
+
+    def __init__(self, flush_interval: float):
+        self._flush_interval: float = flush_interval
+        self._pending: dict[int, datetime] = {}
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        """Number of ids with unsaved activity."""
+
+        return len(self._pending)
+
+    def update(self, object_id: int, timestamp: datetime):
+        """Record activity of a user or role."""
+
+        self._merge({object_id: timestamp})
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def get(self, object_id: int, stored: Optional[datetime] = None) -> Optional[datetime]:
+        """Return the latest activity of a user or role, given the timestamp stored in the database."""
+
+        if (pending := self._pending.get(object_id)) is None:
+            return stored
+        if stored is None:
+            return pending
+
+        return max(pending, stored)
+
+    async def flush(self):
+        """Write all unsaved activity to the database now."""
+
+        # use a separate task, so the database session of the caller is not replaced
+        await asyncio.create_task(self._flush())
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self._flush_interval)
+                await self._flush()
+        except asyncio.CancelledError:
+            await self._flush()
+            raise
+
+    def _merge(self, timestamps: dict[int, datetime]):
+        for object_id, timestamp in timestamps.items():
+            if (current := self._pending.get(object_id)) is None or timestamp > current:
+                self._pending[object_id] = timestamp
+
+    async def _flush(self):
+        async with self._lock:
+            try:
+                await activity_stats.flush()
+            except Exception:
+                logger.exception("Could not save activity statistics, retrying later")
+
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            try:
+                async with db_context():
+                    await Activity.bulk_update(pending)
+            except Exception:
+                logger.exception("Could not save activity of %s users and roles, retrying later", len(pending))
+                self._merge(pending)
+                return
+            except BaseException:
+                self._merge(pending)
+                raise
+
+            logger.debug("Saved activity of %s users and roles", len(pending))
+
+
+activity_tracker = ActivityTracker(FLUSH_INTERVAL)
@@ -44,6 +44,7 @@ from ...pubsub import (
     revoke_verification,
     send_alert,
 )
+from ...write_behind import audit_queue
 
 
 logger = get_logger(__name__)
@@ -249,6 +250,9 @@ class UserInfoCog(Cog, name="User Information"):
         show moderation log of a user
         """
 
+        # make sure that recent events are included
+        await audit_queue.flush()
+
         guild: Guild = self.bot.guilds[0]
 
         user, user_id, arg_passed = await get_user(ctx, user, UserInfoPermission.view_userlog)
@@ -8,6 +8,8 @@ from sqlalchemy import BigInteger, Boolean, Column, Integer, Text
 
 from PyDrocsid.database import Base, UTCDateTime, db, filter_by
 
+from ...write_behind import audit_queue
+
 
 class Join(Base):
     __tablename__ = "join"
@@ -43,8 +45,7 @@ class Leave(Base):
     @staticmethod
     async def create(member: int, member_name: str) -> Leave:
         row = Leave(member=member, member_name=member_name, timestamp=utcnow())
-        await db.add(row)
-        return row
+        return audit_queue.add(row)
 
 
 class UsernameUpdate(Base):
@@ -60,8 +61,7 @@ class UsernameUpdate(Base):
     @staticmethod
     async def create(member: int, member_name: str, new_name: str, nick: bool) -> UsernameUpdate:
         row = UsernameUpdate(member=member, member_name=member_name, new_name=new_name, nick=nick, timestamp=utcnow())
-        await db.add(row)
-        return row
+        return audit_queue.add(row)
 
 
 class Verification(Base):
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import re
+from collections import OrderedDict
+from functools import cached_property
+from typing import Optional
+
+from discord import Message
+
+from PyDrocsid.config import Config
+from PyDrocsid.permission import BasePermission, BasePermissionLevel
+
+
+URL_PATTERNS = [
+    # urls with and without scheme, trailing punctuation is stripped
+    re.compile(r"((https?://)?([a-zA-Z0-9\-_~]+\.)+[a-zA-Z0-9\-_~.]+(\S*[a-zA-Z0-9])?)"),
+    # urls with and without scheme, including trailing punctuation
+    re.compile(r"((https?://)?([a-zA-Z0-9\-_~]+\.)+[a-zA-Z0-9\-_~.]+\S*)"),
+    # discord invites
+    re.compile(r"((discord\.gg/|discord(app)?\.com/invite/)[a-zA-Z0-9]+)"),
+]
+DISCORD_TOKEN_PATTERN = re.compile(r"([A-Za-z\d\-_]+)\.[A-Za-z\d\-_]+\.[A-Za-z\d\-_]+")
+
+# number of messages (or message versions) whose analysis is kept
+CACHE_SIZE = 256
+
+
+class MessageAnalysis:
+    """
+    Facts about a message which are needed by multiple moderation cogs.
+    Every fact is computed on first access, so each message is scanned at most once for each of them.
+    """
+
+    def __init__(self, message: Message):
+        self.message: Message = message
+        self._permission_level: Optional[BasePermissionLevel] = None
+
+    @cached_property
+    def normalized_text(self) -> str:
+        """The casefolded content of the message."""
+
+        return self.message.content.casefold()
+
+    @cached_property
+    def _url_matches(self) -> list[set[str]]:
+        return [{url for url, *_ in pattern.findall(self.message.content)} for pattern in URL_PATTERNS]
+
+    @property
+    def urls(self) -> set[str]:
+        """All strings in the message which look like urls or discord invites (with or without scheme)."""
+
+        return set().union(*self._url_matches)
+
+    @property
+    def http_urls(self) -> list[str]:
+        """All urls with an http or https scheme, without trailing punctuation."""
+
+        return sorted(url for url in self._url_matches[0] if url.startswith(("http://", "https://")))
+
+    @cached_property
+    def token_candidates(self) -> list[str]:
+        """All strings in the message which are formatted like a discord bot token."""
+
+        out = []
+        for match in DISCORD_TOKEN_PATTERN.finditer(self.message.content):
+            try:
+                if base64.urlsafe_b64decode(match.group(1)).isdigit():
+                    out.append(match.group(0))
+            except binascii.Error:
+                continue
+
+        return out
+
+    async def permission_level(self) -> BasePermissionLevel:
+        """The permission level of the message author."""
+
+        if self._permission_level is None:
+            self._permission_level = await Config.PERMISSION_LEVELS.get_permission_level(self.message.author)
+
+        return self._permission_level
+
+    async def bypasses(self, permission: BasePermission) -> bool:
+        """Return whether the message author has the given (bypass) permission."""
+
+        return (await self.permission_level()).level >= (await permission.resolve()).level
+
+    async def is_exempt(self, bypass: BasePermission, ignore_bots: bool = True) -> bool:
+        """Return whether the message must not be checked by a moderation cog with the given bypass permission."""
+
+        if self.message.guild is None:
+            return True
+        if ignore_bots and self.message.author.bot:
+            return True
+
+        return await self.bypasses(bypass)
+
+
+_cache: OrderedDict[tuple[int, str], MessageAnalysis] = OrderedDict()
+
+
+def analyze(message: Message) -> MessageAnalysis:
+    """Return the shared analysis of a message (a new one for each edit of the message)."""
+
+    key = (message.id, message.content)
+    if (analysis := _cache.get(key)) is not None:
+        _cache.move_to_end(key)
+        return analysis
+
+    analysis = _cache[key] = MessageAnalysis(message)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+    return analysis
@@ -1,4 +1,4 @@
-from PyDrocsid.settings import Settings
+from ...settings_cache import SnapshotSettings
 
 
 class AutoKickMode:
@@ -7,7 +7,7 @@ class AutoKickMode:
     reverse = 2
 
 
-class AutoModSettings(Settings):
+class AutoModSettings(SnapshotSettings):
     autokick_mode = AutoKickMode.off
     autokick_delay = 30
     autokick_role = -1
@@ -1,7 +1,11 @@
+import json
 import re
+from asyncio import TimeoutError
+from typing import AsyncIterator
 
-from discord import Embed, Forbidden, Message
-from discord.ext import commands
+from aiohttp import ClientError, ClientSession
+from discord import Attachment, Embed, Forbidden, Message
+from discord.ext import commands, tasks
 from discord.ext.commands import CommandError, Context, Converter, UserInputError, guild_only
 
 from PyDrocsid.cog import Cog
@@ -15,9 +19,11 @@ from PyDrocsid.redis import redis
 from PyDrocsid.translations import t
 
 from .colors import Colors
-from .models import BadWord, BadWordPost, sync_redis
+from .engine import BENCHMARK_BATCH_SIZE, WorkerError, benchmark_corpus, probe, rule_stats
+from .models import BadWord, BadWordPost, flush_stats, get_stats, reset_stats, sync_redis
 from .permissions import ContentFilterPermission
 from ...contributor import Contributor
+from ...message_analysis import analyze
 from ...pubsub import get_userlog_entries, send_alert, send_to_changelog
 
 
@@ -41,10 +47,13 @@ class ContentFilterConverter(Converter):
 class RegexConverter(Converter):
     async def convert(self, ctx: Context, argument: str) -> str:
         try:
-            re.compile(argument)
+            pattern = re.compile(argument)
         except re.error:
             raise CommandError(t.invalid_regex)
 
+        if not await probe(pattern):
+            raise CommandError(t.regex_too_slow)
+
         return argument
 
 
@@ -52,6 +61,48 @@ def findall(regex: str, text: str) -> list[str]:
     return [match[0] for match in re.finditer(regex, text)]
 
 
+async def read_corpus(attachment: Attachment) -> AsyncIterator[list[str]]:
+    """
+    Stream the messages of a corpus file (one message per line or a JSONL export) in batches.
+
+    :raises ValueError: if the file is a JSON file or a JSONL file without any valid entry
+    """
+
+    filename = attachment.filename.lower()
+    if filename.endswith(".json"):
+        # a regular (e.g. pretty-printed) json export can't be streamed line by line
+        raise ValueError("JSON files are not supported, use JSONL instead")
+
+    jsonl = filename.endswith(".jsonl")
+    parsed = False
+    batch: list[str] = []
+    async with ClientSession() as session, session.get(attachment.url) as response:
+        async for line in response.content:
+            text = line.decode(errors="replace").rstrip("\r\n")
+            if jsonl:
+                try:
+                    entry = json.loads(text)
+                except ValueError:
+                    continue
+                if not isinstance(entry, dict):
+                    continue
+                parsed = True
+                text = entry.get("content", "")
+
+            if not text:
+                continue
+
+            batch.append(text)
+            if len(batch) >= BENCHMARK_BATCH_SIZE:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+    elif jsonl and not parsed:
+        raise ValueError("No valid JSONL entry found")
+
+
 async def get_new_matches(message_id: int, matches: set[str]) -> set[str]:
     new_matches = matches - set(await redis.lrange(key := f"content_filter:alert:{message_id}", 0, -1))
 
@@ -67,26 +118,24 @@ async def get_new_matches(message_id: int, matches: set[str]) -> set[str]:
 async def check_message(message: Message) -> None:
     author = message.author
 
-    if message.guild is None:
-        return
-    if await ContentFilterPermission.bypass.check_permissions(author):
+    analysis = analyze(message)
+    if await analysis.is_exempt(ContentFilterPermission.bypass, ignore_bots=False):
         return
 
-    violation_regexs: set[str] = set()
-    violation_matches: set[str] = set()
-    for regex in await BadWord.get_all_redis():
-        if not (matches := findall(regex, message.content)):
-            continue
+    rule_set = await BadWord.get_rule_set()
+    violations, timed_out = await rule_set.scan_bounded(message.content, analysis.normalized_text)
 
-        violation_regexs.add(regex)
-        violation_matches.update(matches)
+    for rule in timed_out:
+        rule_set.mark_slow(rule)
+        if await BadWord.mark_slow(rule.id):
+            await send_alert(message.guild, t.log_pattern_timeout(rule.regex, rule.id, message.jump_url))
 
-    if not violation_regexs:
+    if not violations:
         return
 
-    bad_words: list[BadWord] = await db.all(select(BadWord).where(BadWord.regex.in_(violation_regexs)))
-    bad_word_ids: set[int] = {bad_word.id for bad_word in bad_words}
-    delete_message = any(bad_word.delete for bad_word in bad_words)
+    violation_matches: set[str] = {match for _, matches in violations for match in matches}
+    bad_word_ids: set[int] = {rule.id for rule, _ in violations}
+    delete_message = any(rule.delete for rule, _ in violations)
 
     was_deleted = False
     if delete_message:
@@ -100,6 +149,9 @@ async def check_message(message: Message) -> None:
     else:
         log_text = t.log_forbidden_posted
 
+    for rule, _ in violations:
+        rule_stats.record_match(rule.id, was_deleted)
+
     new_matches: set[str] = await get_new_matches(message.id, violation_matches)
     if new_matches:
         await send_alert(
@@ -138,6 +190,16 @@ class ContentFilterCog(Cog, name="Content Filter"):
 
         return out
 
+    async def on_ready(self):
+        try:
+            self.stats_loop.start()
+        except RuntimeError:
+            self.stats_loop.restart()
+
+    @tasks.loop(minutes=1)
+    async def stats_loop(self):
+        await flush_stats()
+
     async def on_message(self, message: Message):
         await check_message(message)
 
@@ -230,6 +292,8 @@ class ContentFilterCog(Cog, name="Content Filter"):
 
         old = pattern.regex
         pattern.regex = new_regex
+        await redis.srem("content_filter:slow", pattern.id)
+        await reset_stats(pattern.id)
         await sync_redis()
 
         await add_reactions(ctx.message, "white_check_mark")
@@ -240,6 +304,7 @@ class ContentFilterCog(Cog, name="Content Filter"):
     async def delete_message(self, ctx: Context, pattern: ContentFilterConverter, delete: bool):
         pattern: BadWord
         pattern.delete = delete
+        await sync_redis()
 
         await add_reactions(ctx.message, "white_check_mark")
         await send_to_changelog(ctx.guild, t.log_delete_updated(pattern.delete, pattern.regex))
@@ -270,3 +335,79 @@ class ContentFilterCog(Cog, name="Content Filter"):
         embed.add_field(name=t.matches, value="\n".join(out) or t.no_matches)
 
         await send_long_embed(ctx, embed, paginate=True)
+
+    @content_filter.command(name="stats", aliases=["s"])
+    @ContentFilterPermission.read.check
+    @docs(t.commands.stats)
+    async def stats(self, ctx: Context):
+        stats = await get_stats()
+        rules: list[BadWord] = await BadWord.get_all_db()
+        rules.sort(key=lambda r: stats.get(r.id, {}).get("time", 0), reverse=True)
+
+        embed = Embed(title=t.stats_header, colour=Colors.ContentFilter)
+        for rule in rules:
+            values = stats.get(rule.id, {})
+            evaluations = values.get("evaluations", 0)
+            total_time = values.get("time", 0)
+            embed.add_field(
+                name=t.embed_field_name(rule.id, rule.description),
+                value=t.stats_field_value(
+                    rule.regex,
+                    evaluations,
+                    f"{total_time / evaluations if evaluations else 0:.1f}",
+                    f"{total_time / 1000:.1f}",
+                    values.get("matches", 0),
+                    values.get("kept", 0),
+                ),
+                inline=False,
+            )
+
+        if not embed.fields:
+            embed.colour = Colors.error
+            embed.description = t.no_pattern_listed
+
+        await send_long_embed(ctx, embed, paginate=True, max_fields=6)
+
+    @content_filter.command(name="benchmark", aliases=["bench", "b"])
+    @ContentFilterPermission.read.check
+    @docs(t.commands.benchmark)
+    async def benchmark(self, ctx: Context):
+        if not ctx.message.attachments:
+            raise CommandError(t.no_corpus)
+
+        rule_set = await BadWord.get_rule_set()
+        try:
+            result = await benchmark_corpus(rule_set, read_corpus(ctx.message.attachments[0]))
+        except TimeoutError:
+            raise CommandError(t.benchmark_timeout)
+        except WorkerError:
+            raise CommandError(t.benchmark_failed)
+        except (ClientError, ValueError):
+            raise CommandError(t.corpus_not_readable)
+
+        messages = result.messages
+        embed = Embed(title=t.benchmark_header, colour=Colors.ContentFilter)
+        embed.description = t.benchmark_summary(
+            messages.count,
+            f"{messages.total:.2f}",
+            f"{messages.count / messages.total if messages.total else 0:.0f}",
+            f"{messages.total / messages.count * 1_000_000 if messages.count else 0:.1f}",
+            f"{messages.quantile(0.99) * 1_000_000:.1f}",
+        )
+
+        descriptions: dict[int, str] = {rule.id: rule.description for rule in await BadWord.get_all_db()}
+        for rule in sorted(rule_set.rules, key=lambda r: -result.rules[r.id].total if r.id in result.rules else 0):
+            histogram = result.rules.get(rule.id)
+            embed.add_field(
+                name=t.embed_field_name(rule.id, descriptions.get(rule.id, "")),
+                value=t.benchmark_field_value(
+                    rule.regex,
+                    result.matches[rule.id],
+                    histogram.count if histogram else 0,
+                    f"{histogram.total * 1000 if histogram else 0:.1f}",
+                    f"{histogram.quantile(0.99) * 1_000_000 if histogram else 0:.1f}",
+                ),
+                inline=False,
+            )
+
+        await send_long_embed(ctx, embed, paginate=True, max_fields=6)
@@ -0,0 +1,643 @@
+from __future__ import annotations
+
+import re
+from asyncio import Semaphore, TimeoutError
+from collections import Counter, deque
+from math import log
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from time import monotonic, perf_counter
+from types import GeneratorType
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, Optional, Pattern
+
+
+try:
+    from re import _parser as sre_parse  # noqa
+except ImportError:
+    import sre_parse  # noqa
+
+from PyDrocsid.async_thread import run_in_thread
+from PyDrocsid.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+REPEAT_OPCODES = tuple(
+    getattr(sre_parse, name) for name in ["MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"] if hasattr(sre_parse, name)
+)
+ATOMIC_GROUP = getattr(sre_parse, "ATOMIC_GROUP", None)
+
+# maximum number of spellings of a literal with character classes (e.g. b[a4]d) to add to the prefilter
+MAX_LITERAL_VARIANTS = 16
+
+# how long a process-local rule set is used before the version counter in redis is checked again
+VERSION_CHECK_INTERVAL = 5
+
+# messages longer than this are never matched on the event loop
+OFFLOAD_TEXT_LENGTH = 1000
+# maximum time (in seconds) the evaluation of a single offloaded rule may take
+MATCH_TIME_BUDGET = 2
+# number of worker processes for offloaded rule evaluations
+WORKER_PROCESSES = 2
+
+# number of messages evaluated per worker task in corpus benchmarks and the time budget (in seconds) for each batch
+BENCHMARK_BATCH_SIZE = 1000
+BENCHMARK_BATCH_BUDGET = 30
+# number of worker processes for corpus benchmarks (separate from the workers used for live messages)
+BENCHMARK_PROCESSES = 1
+
+# length of the inputs used to probe new patterns for catastrophic backtracking
+PROBE_INPUT_LENGTH = 2000
+# maximum time (in seconds) a new pattern may take to process all probe inputs
+PROBE_TIME_BUDGET = 1
+
+
+def timed_findall(regex: str, text: str) -> tuple[list[str], float]:
+    start = perf_counter()
+    matches = [match[0] for match in re.finditer(regex, text)]
+    return matches, perf_counter() - start
+
+
+def evaluate_rules(rules: list[tuple[int, str]], text: str) -> Iterator[tuple[int, list[str], float]]:
+    """Evaluate multiple rules in a worker process and yield the matches and duration of each rule."""
+
+    for rule_id, regex in rules:
+        yield rule_id, *timed_findall(regex, text)
+
+
+def run_probe(regex: str, inputs: list[str]) -> None:
+    pattern = re.compile(regex)
+    for text in inputs:
+        for _ in pattern.finditer(text):
+            pass
+
+
+def iter_children(av: Any) -> Iterator[sre_parse.SubPattern]:
+    """Iterate over the subpatterns which are direct arguments of an opcode."""
+
+    for item in av if isinstance(av, (tuple, list)) else [av]:
+        for sub in item if isinstance(item, list) else [item]:
+            if isinstance(sub, sre_parse.SubPattern):
+                yield sub
+
+
+def iter_opcodes(pattern: sre_parse.SubPattern) -> Iterator[tuple[object, object]]:
+    """Recursively iterate over all opcodes of a parsed regular expression."""
+
+    for op, av in pattern:
+        yield op, av
+        for sub in iter_children(av):
+            yield from iter_opcodes(sub)
+
+
+def has_nested_quantifiers(parsed: sre_parse.SubPattern, in_repeat: bool = False) -> bool:
+    """Return whether a parsed regex contains an unbounded quantifier inside another one, e.g. (a+)+ or (a|b*)*."""
+
+    for op, av in parsed:
+        if op in REPEAT_OPCODES:
+            unbounded = av[1] == sre_parse.MAXREPEAT
+            if unbounded and in_repeat:
+                return True
+            if has_nested_quantifiers(av[2], in_repeat or unbounded):
+                return True
+        elif any(has_nested_quantifiers(sub, in_repeat) for sub in iter_children(av)):
+            return True
+
+    return False
+
+
+def probe_inputs(pattern: Pattern[str]) -> list[str]:
+    """Generate long inputs from the characters a pattern consumes, which are likely to trigger backtracking."""
+
+    categories = {sre_parse.CATEGORY_DIGIT: "1", sre_parse.CATEGORY_SPACE: " ", sre_parse.CATEGORY_WORD: "a"}
+    chars: set[str] = set()
+    for op, av in iter_opcodes(sre_parse.parse(pattern.pattern)):
+        if op == sre_parse.LITERAL:
+            chars.add(chr(av))
+        elif op == sre_parse.ANY:
+            chars.add("a")
+        elif op == sre_parse.IN:
+            for item_op, item_av in av:
+                if item_op == sre_parse.LITERAL:
+                    chars.add(chr(item_av))
+                elif item_op == sre_parse.RANGE:
+                    chars.add(chr(item_av[0]))
+                elif item_op == sre_parse.CATEGORY and item_av in categories:
+                    chars.add(categories[item_av])
+
+    sample = sorted(chars)[:16] or ["a", " "]
+    mixed = "".join(sample) * (PROBE_INPUT_LENGTH // len(sample) + 1)
+    return [char * PROBE_INPUT_LENGTH + "\0" for char in sample] + [mixed[:PROBE_INPUT_LENGTH] + "\0"]
+
+
+def can_be_combined(pattern: Pattern[str]) -> bool:
+    """Return whether a compiled pattern keeps its semantics when embedded in a larger alternation."""
+
+    if pattern.flags & ~re.UNICODE or pattern.groupindex:
+        return False
+
+    parsed = sre_parse.parse(pattern.pattern)
+    return not any(op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS) for op, _ in iter_opcodes(parsed))
+
+
+def required_literals(parsed: sre_parse.SubPattern) -> Optional[frozenset[str]]:
+    """
+    Find a set of literals of which at least one has to occur in every string matched by a parsed regex.
+    If there are multiple candidates, the most selective one (the one with the longest shortest literal) is chosen.
+    """
+
+    best: Optional[frozenset[str]] = None
+
+    def consider(factor: Optional[frozenset[str]]):
+        nonlocal best
+        if factor and (best is None or min(map(len, factor)) > min(map(len, best))):
+            best = factor
+
+    # all possible spellings of the current sequence of literals and small character classes
+    run: set[str] = {""}
+    for op, av in parsed:
+        chars: Optional[set[str]] = None
+        if op == sre_parse.LITERAL:
+            chars = {chr(av)}
+        elif op == sre_parse.IN and all(item_op == sre_parse.LITERAL for item_op, _ in av):
+            chars = {chr(item_av) for _, item_av in av}
+
+        if chars is not None and len(run) * len(chars) <= MAX_LITERAL_VARIANTS:
+            run = {prefix + char for prefix in run for char in chars}
+            continue
+
+        consider(frozenset(run - {""}))
+        run = chars or {""}
+
+        if op == sre_parse.SUBPATTERN and not av[1] & sre_parse.SRE_FLAG_IGNORECASE:
+            consider(required_literals(av[3]))
+        elif op in REPEAT_OPCODES and av[0] >= 1:
+            consider(required_literals(av[2]))
+        elif op == ATOMIC_GROUP:
+            consider(required_literals(av))
+        elif op == sre_parse.BRANCH:
+            factors = [required_literals(branch) for branch in av[1]]
+            if all(factors):
+                consider(frozenset().union(*factors))
+
+    consider(frozenset(run - {""}))
+
+    return best
+
+
+def extract_literals(pattern: Pattern[str]) -> Optional[frozenset[str]]:
+    """Return the casefolded literals required by a compiled pattern or None if there are no such literals."""
+
+    if pattern.flags & re.IGNORECASE:
+        return None
+
+    if (literals := required_literals(sre_parse.parse(pattern.pattern))) is None:
+        return None
+
+    return frozenset(literal.casefold() for literal in literals)
+
+
+class LiteralAutomaton:
+    """Aho-Corasick automaton to find all occurrences of a set of literals in a single pass over a text."""
+
+    def __init__(self, literals: Iterable[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[frozenset[str]] = [frozenset()]
+
+        for literal in literals:
+            state = 0
+            for char in literal:
+                if char not in self._goto[state]:
+                    self._goto[state][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(frozenset())
+                state = self._goto[state][char]
+            self._out[state] |= {literal}
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> set[str]:
+        """Return all literals occurring in the given text."""
+
+        goto, fail, out = self._goto, self._fail, self._out
+        found: set[str] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+
+        return found
+
+
+class Rule:
+    def __init__(self, rule_id: int, regex: str, delete: bool, pattern: Pattern[str]):
+        self.id: int = rule_id
+        self.regex: str = regex
+        self.delete: bool = delete
+        self.pattern: Pattern[str] = pattern
+        self.literals: Optional[frozenset[str]] = extract_literals(pattern)
+        self.slow: bool = has_nested_quantifiers(sre_parse.parse(regex))
+
+    def findall(self, text: str) -> list[str]:
+        return [match[0] for match in self.pattern.finditer(text)]
+
+
+class RuleSet:
+    """Set of precompiled content filter rules."""
+
+    def __init__(self, version: int, rules: list[tuple[int, str, bool]], slow_rules: Iterable[int] = ()):
+        self.version: int = version
+        self.rules: list[Rule] = []
+        # slow_rules may be a one-shot iterator, but it is checked once per rule
+        slow_rules = frozenset(slow_rules)
+
+        for rule_id, regex, delete in rules:
+            try:
+                rule = Rule(rule_id, regex, delete, re.compile(regex))
+            except re.error:
+                logger.warning("Content filter pattern %s could not be compiled: %s", rule_id, regex)
+                continue
+
+            rule.slow |= rule_id in slow_rules
+            self.rules.append(rule)
+
+        # rules with required literals are only evaluated if one of their literals occurs in the message
+        self.literal_rules: dict[str, list[Rule]] = {}
+        for rule in self.rules:
+            for literal in rule.literals or []:
+                self.literal_rules.setdefault(literal, []).append(rule)
+        self.automaton = LiteralAutomaton(self.literal_rules)
+
+        self.standalone: list[Rule] = []
+        self.combined: Optional[Pattern[str]] = None
+        self._combine()
+
+    def _combine(self):
+        # all other fast patterns that can be embedded are merged into a single alternation, so that messages which
+        # do not contain any forbidden expression (by far the most common case) only need to be scanned once
+        unfiltered = [rule for rule in self.rules if rule.literals is None]
+        combinable = [rule for rule in unfiltered if not rule.slow and can_be_combined(rule.pattern)]
+        self.standalone = [rule for rule in unfiltered if rule not in combinable]
+        self.combined = None
+        if combinable:
+            try:
+                self.combined = re.compile("|".join(f"(?:{rule.regex})" for rule in combinable))
+            except re.error:
+                self.standalone = unfiltered
+
+    def mark_slow(self, rule: Rule):
+        """Exclude a rule from inline evaluation."""
+
+        rule.slow = True
+        if rule.literals is None:
+            self._combine()
+
+    def candidates(self, text: str, gate: bool = True, folded: Optional[str] = None) -> list[Rule]:
+        """
+        Return all rules that could possibly match the given text.
+        If gate is False, the combined alternation is not evaluated and all rules without literals are returned.
+        The casefolded text can be passed if it is already known.
+        """
+
+        out: dict[int, Rule] = {}
+        for literal in self.automaton.find(text.casefold() if folded is None else folded):
+            out.update((rule.id, rule) for rule in self.literal_rules[literal])
+
+        if not gate or self.combined is None or self.combined.search(text):
+            out.update((rule.id, rule) for rule in self.rules if rule.literals is None)
+        else:
+            out.update((rule.id, rule) for rule in self.standalone)
+
+        return list(out.values())
+
+    def scan(self, text: str) -> list[tuple[Rule, list[str]]]:
+        """Return all rules matching the given text together with their matches."""
+
+        return [(rule, matches) for rule in self.candidates(text) if (matches := rule.findall(text))]
+
+    async def scan_bounded(
+        self, text: str, folded: Optional[str] = None
+    ) -> tuple[list[tuple[Rule, list[str]]], list[Rule]]:
+        """
+        Like scan, but never evaluates slow rules or long texts on the event loop.
+        These evaluations are offloaded to worker processes and aborted if they exceed the time budget.
+
+        :return: a list of matching rules with their matches and a list of rules which exceeded the time budget
+        """
+
+        long_text = len(text) > OFFLOAD_TEXT_LENGTH
+        candidates = self.candidates(text, gate=not long_text, folded=folded)
+        offloaded = [rule for rule in candidates if rule.slow or long_text]
+
+        violations: list[tuple[Rule, list[str]]] = []
+        for rule in candidates:
+            if rule in offloaded:
+                continue
+
+            start = perf_counter()
+            matches = rule.findall(text)
+            rule_stats.record_evaluation(rule.id, perf_counter() - start)
+            if matches:
+                violations.append((rule, matches))
+
+        if not offloaded:
+            return violations, []
+
+        # all offloaded rules are evaluated by a single worker task, which reports the result of every rule as soon as
+        # it is available, so if the time budget is exceeded, the rule that was running at this time is known
+        rules: dict[int, Rule] = {rule.id: rule for rule in offloaded}
+        timed_out: list[Rule] = []
+        remaining: list[Rule] = offloaded
+        while remaining:
+            results: list[tuple[int, list[str], float]] = []
+            try:
+                await worker_pool.run(
+                    evaluate_rules,
+                    [(rule.id, rule.regex) for rule in remaining],
+                    text,
+                    timeout=MATCH_TIME_BUDGET,
+                    progress=results.append,
+                )
+            except TimeoutError:
+                # skip the rule which exceeded the time budget and evaluate the others in a new task
+                done = len(results)
+                stuck, *remaining = remaining[done:]
+                rule_stats.record_evaluation(stuck.id, MATCH_TIME_BUDGET)
+                timed_out.append(stuck)
+            except WorkerError:
+                logger.exception("Could not evaluate content filter rules")
+                remaining = []
+            else:
+                remaining = []
+
+            for rule_id, matches, duration in results:
+                rule_stats.record_evaluation(rule_id, duration)
+                if matches:
+                    violations.append((rules[rule_id], matches))
+
+        return violations, timed_out
+
+
+class Histogram:
+    """Fixed-memory histogram of durations with logarithmically growing buckets."""
+
+    BASE = 1.05
+
+    def __init__(self):
+        self.buckets: Counter[int] = Counter()
+        self.count: int = 0
+        self.total: float = 0
+
+    def add(self, duration: float):
+        microseconds = duration * 1_000_000
+        self.buckets[int(log(microseconds, self.BASE)) if microseconds > 1 else 0] += 1
+        self.count += 1
+        self.total += duration
+
+    def merge(self, other: Histogram):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, q: float) -> float:
+        """Return an upper bound (within 5%) of the given quantile in seconds."""
+
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= q * self.count:
+                return self.BASE ** (bucket + 1) / 1_000_000
+
+        return 0
+
+
+class BenchmarkResult:
+    def __init__(self):
+        self.messages: Histogram = Histogram()
+        self.rules: dict[int, Histogram] = {}
+        self.matches: Counter[int] = Counter()
+
+    def merge(self, other: BenchmarkResult):
+        self.messages.merge(other.messages)
+        for rule_id, histogram in other.rules.items():
+            self.rules.setdefault(rule_id, Histogram()).merge(histogram)
+        self.matches.update(other.matches)
+
+
+def run_benchmark(version: int, rules: list[tuple[int, str, bool]], texts: list[str]) -> BenchmarkResult:
+    """
+    Evaluate a rule set against a batch of messages in a worker process.
+    Unlike check_message, all candidate rules are evaluated directly, regardless of the length of the message and of
+    rules marked as slow, so the result reflects the cost of the patterns themselves.
+    """
+
+    if (rule_set := rule_cache.rule_set) is None or rule_set.version != version:
+        rule_set = rule_cache.put(RuleSet(version, rules))
+
+    result = BenchmarkResult()
+    for text in texts:
+        start = perf_counter()
+        for rule in rule_set.candidates(text):
+            rule_start = perf_counter()
+            if rule.findall(text):
+                result.matches[rule.id] += 1
+            result.rules.setdefault(rule.id, Histogram()).add(perf_counter() - rule_start)
+        result.messages.add(perf_counter() - start)
+
+    return result
+
+
+class RuleStats:
+    """In-memory accumulator for per-rule statistics, which is periodically flushed to redis."""
+
+    FIELDS = ["evaluations", "time", "matches", "kept"]
+
+    def __init__(self):
+        self.counters: dict[str, Counter[int]] = {field: Counter() for field in self.FIELDS}
+
+    def record_evaluation(self, rule_id: int, duration: float):
+        self.counters["evaluations"][rule_id] += 1
+        self.counters["time"][rule_id] += round(duration * 1_000_000)
+
+    def record_match(self, rule_id: int, deleted: bool):
+        self.counters["matches"][rule_id] += 1
+        if not deleted:
+            self.counters["kept"][rule_id] += 1
+
+    def pop(self) -> dict[str, Counter[int]]:
+        """Return and reset all counters collected since the last call."""
+
+        counters, self.counters = self.counters, {field: Counter() for field in self.FIELDS}
+        return counters
+
+
+rule_stats = RuleStats()
+
+
+class WorkerError(Exception):
+    """An exception was raised in a worker process."""
+
+
+def worker_main(connection: Connection):
+    """Main loop of a worker process: receive function calls and send back their results."""
+
+    while True:
+        try:
+            func, args = connection.recv()
+        except EOFError:
+            return
+
+        try:
+            result = func(*args)
+            if isinstance(result, GeneratorType):
+                for item in result:
+                    connection.send(("progress", item))
+                result = None
+        except Exception as e:
+            connection.send(("error", repr(e)))
+        else:
+            connection.send(("done", result))
+
+
+class Worker:
+    def __init__(self):
+        self.connection, child = Pipe()
+        self.process = Process(target=worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class WorkerPool:
+    """
+    Pool of worker processes for regex evaluations which must not block the event loop.
+    Every task has its own deadline, and only the worker process of a task that exceeds its deadline is killed, so
+    the tasks of other callers are not affected.
+    """
+
+    def __init__(self, processes: int):
+        self._processes: int = processes
+        self._semaphore: Optional[Semaphore] = None
+        self._idle: list[Worker] = []
+
+    async def run(
+        self, func: Callable[..., Any], *args: Any, timeout: float, progress: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """
+        Run a function in a worker process as soon as one is available and return its result.
+        If the function returns a generator, every item it yields is passed to progress and the timeout applies to
+        each item separately.
+
+        :raises TimeoutError: if the function does not return (or yield) in time, in this case the worker is killed
+        :raises WorkerError: if the function raises an exception
+        """
+
+        if self._semaphore is None:
+            self._semaphore = Semaphore(self._processes)
+
+        async with self._semaphore:
+            worker = self._idle.pop() if self._idle else Worker()
+            try:
+                worker.connection.send((func, args))
+                while True:
+                    if not await run_in_thread(worker.connection.poll)(timeout):
+                        raise TimeoutError
+
+                    kind, value = worker.connection.recv()
+                    if kind != "progress":
+                        break
+                    if progress:
+                        progress(value)
+            except TimeoutError:
+                worker.kill()
+                raise
+            except (EOFError, OSError) as e:
+                # the worker has crashed
+                worker.kill()
+                raise WorkerError(repr(e))
+            except BaseException:
+                # the worker is still busy with a cancelled task
+                worker.kill()
+                raise
+
+            self._idle.append(worker)
+
+        if kind == "error":
+            raise WorkerError(value)
+        return value
+
+
+worker_pool = WorkerPool(WORKER_PROCESSES)
+benchmark_pool = WorkerPool(BENCHMARK_PROCESSES)
+
+
+async def benchmark_corpus(rule_set: RuleSet, batches: AsyncIterator[list[str]]) -> BenchmarkResult:
+    """
+    Evaluate a rule set against a stream of message batches in the worker pool.
+
+    :return: the merged benchmark result
+    :raises TimeoutError: if a single batch exceeds its time budget
+    :raises WorkerError: if a batch could not be evaluated
+    """
+
+    rules = [(rule.id, rule.regex, rule.delete) for rule in rule_set.rules]
+    result = BenchmarkResult()
+    async for batch in batches:
+        result.merge(
+            await benchmark_pool.run(run_benchmark, rule_set.version, rules, batch, timeout=BENCHMARK_BATCH_BUDGET)
+        )
+
+    return result
+
+
+async def probe(pattern: Pattern[str]) -> bool:
+    """Return whether a pattern can process inputs designed to trigger catastrophic backtracking in time."""
+
+    try:
+        await worker_pool.run(run_probe, pattern.pattern, probe_inputs(pattern), timeout=PROBE_TIME_BUDGET)
+    except TimeoutError:
+        return False
+
+    return True
+
+
+class RuleSetCache:
+    """Process-local cache for the current rule set."""
+
+    def __init__(self):
+        self.rule_set: Optional[RuleSet] = None
+        self._valid_until: float = 0
+
+    def get(self) -> Optional[RuleSet]:
+        """Return the cached rule set if it does not need to be validated against redis yet."""
+
+        if self.rule_set is None or monotonic() >= self._valid_until:
+            return None
+
+        return self.rule_set
+
+    def put(self, rule_set: RuleSet) -> RuleSet:
+        self.rule_set = rule_set
+        self._valid_until = monotonic() + VERSION_CHECK_INTERVAL
+        return rule_set
+
+
+rule_cache = RuleSetCache()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime
 from typing import Union
 
@@ -10,26 +11,64 @@ from PyDrocsid.database import Base, UTCDateTime, db, select
 from PyDrocsid.environment import CACHE_TTL
 from PyDrocsid.redis import redis
 
+from .engine import RuleSet, RuleStats, rule_cache, rule_stats
+from ...write_behind import audit_queue
 
-async def sync_redis() -> list[str]:
-    out = []
+
+async def sync_redis():
+    rules: list[tuple[int, str, bool]] = []
+
+    regex: BadWord
+    async for regex in await db.stream(select(BadWord)):
+        rules.append((regex.id, regex.regex, regex.delete))
 
     async with redis.pipeline() as pipe:
-        await pipe.delete(key := "content_filter")
+        await pipe.setex("content_filter:rules", CACHE_TTL, json.dumps(rules))
+        await pipe.incr("content_filter:version")
+        await pipe.smembers("content_filter:slow")
+
+        *_, version, slow = await pipe.execute()
+
+    rule_cache.put(RuleSet(version, rules, {int(rule_id) for rule_id in slow}))
 
-        regex: BadWord
-        async for regex in await db.stream(select(BadWord)):
-            out.append(regex.regex)
-            await pipe.lpush(key, regex.regex)
 
-        await pipe.lpush(key, "")
-        await pipe.expire(key, CACHE_TTL)
+async def flush_stats():
+    """Add all locally collected rule statistics to the counters in redis."""
 
+    counters = rule_stats.pop()
+    async with redis.pipeline() as pipe:
+        for field, counter in counters.items():
+            for rule_id, amount in counter.items():
+                await pipe.hincrby(f"content_filter:stats:{field}", rule_id, amount)
         await pipe.execute()
 
+
+async def get_stats() -> dict[int, dict[str, int]]:
+    """Return the statistics of all rules, including those that have not been flushed yet."""
+
+    async with redis.pipeline() as pipe:
+        for field in RuleStats.FIELDS:
+            await pipe.hgetall(f"content_filter:stats:{field}")
+        results = await pipe.execute()
+
+    out: dict[int, dict[str, int]] = {}
+    for field, values in zip(RuleStats.FIELDS, results):
+        for rule_id, amount in values.items():
+            out.setdefault(int(rule_id), dict.fromkeys(RuleStats.FIELDS, 0))[field] += int(amount)
+        for rule_id, amount in rule_stats.counters[field].items():
+            out.setdefault(rule_id, dict.fromkeys(RuleStats.FIELDS, 0))[field] += amount
+
     return out
 
 
+async def reset_stats(rule_id: int):
+    async with redis.pipeline() as pipe:
+        for field in RuleStats.FIELDS:
+            await pipe.hdel(f"content_filter:stats:{field}", rule_id)
+            rule_stats.counters[field].pop(rule_id, None)
+        await pipe.execute()
+
+
 class BadWord(Base):
     __tablename__ = "bad_word_list"
 
@@ -48,14 +87,42 @@ class BadWord(Base):
 
     async def remove(self) -> None:
         await db.delete(self)
+        await reset_stats(self.id)
         await sync_redis()
 
     @staticmethod
-    async def get_all_redis() -> list[str]:
-        if out := await redis.lrange("content_filter", 0, -1):
-            return [x for x in out if x]
+    async def get_rule_set() -> RuleSet:
+        """Return the compiled rule set, rebuilding it only if another process has changed the rules."""
+
+        if rule_set := rule_cache.get():
+            return rule_set
+
+        async with redis.pipeline() as pipe:
+            await pipe.mget("content_filter:version", "content_filter:rules")
+            await pipe.smembers("content_filter:slow")
+            (version, rules), slow = await pipe.execute()
+
+        if version is None or rules is None:
+            await sync_redis()
+            return rule_cache.rule_set
+
+        if rule_cache.rule_set is not None and rule_cache.rule_set.version == int(version):
+            return rule_cache.put(rule_cache.rule_set)
+
+        return rule_cache.put(
+            RuleSet(int(version), [tuple(rule) for rule in json.loads(rules)], {int(rule_id) for rule_id in slow})
+        )
+
+    @staticmethod
+    async def mark_slow(rule_id: int) -> bool:
+        """Mark a pattern as slow in all processes and return whether it has not been marked before."""
 
-        return await sync_redis()
+        async with redis.pipeline() as pipe:
+            await pipe.sadd("content_filter:slow", rule_id)
+            await pipe.incr("content_filter:version")
+            added, _ = await pipe.execute()
+
+        return bool(added)
 
     @staticmethod
     async def get_all_db() -> list[BadWord]:
@@ -83,5 +150,4 @@ class BadWordPost(Base):
             deleted_message=deleted,
             timestamp=utcnow(),
         )
-        await db.add(row)
-        return row
+        return audit_queue.add(row)
@@ -1,90 +1,45 @@
-import re
 from typing import Optional
 
-import requests
-from discord import Embed, Forbidden, Guild, HTTPException, Invite, Member, Message, NotFound
+from discord import Embed, Guild, Invite, Member, Message
 from discord.ext import commands
 from discord.ext.commands import CommandError, Context, Converter, UserInputError, guild_only
-from urllib3.exceptions import LocationParseError
 
-from PyDrocsid.async_thread import run_in_thread
 from PyDrocsid.cog import Cog
 from PyDrocsid.command import Confirmation, optional_permissions, reply
 from PyDrocsid.database import db, filter_by, select
 from PyDrocsid.embeds import send_long_embed
 from PyDrocsid.emojis import name_to_emoji
 from PyDrocsid.events import StopEventHandling
-from PyDrocsid.logger import get_logger
 from PyDrocsid.prefix import get_prefix
 from PyDrocsid.translations import t
 
 from .colors import Colors
-from .models import AllowedInvite, IllegalInvitePost, InviteLog
+from .models import AllowedInvite, IllegalInvitePost, InviteLog, allowed_invites
 from .permissions import InvitesPermission
+from .resolver import get_discord_invites, get_invite_info, invalidate_invites
 from ...contributor import Contributor
+from ...message_analysis import analyze
 from ...pubsub import get_userlog_entries, send_alert, send_to_changelog
 
 
 tg = t.g
 t = t.invites
 
-logger = get_logger(__name__)
-
 
 class AllowedServerConverter(Converter):
     async def convert(self, ctx: Context, argument: str) -> AllowedInvite:
-        try:
-            invite: Invite = await ctx.bot.fetch_invite(argument)
-            if invite.guild is None:
-                raise CommandError(t.invalid_invite)
-            row = await db.get(AllowedInvite, guild_id=invite.guild.id)
-            if row is not None:
-                return row
-        except (NotFound, HTTPException):
-            pass
+        invite = await get_invite_info(ctx.bot, argument, wait=True)
+        if invite is not None and await allowed_invites.contains(invite.guild_id):
+            return await db.get(AllowedInvite, guild_id=invite.guild_id)
 
-        if argument.isnumeric():
-            row = await db.get(AllowedInvite, guild_id=int(argument))
+        if (guild_id := await allowed_invites.find(argument)) is not None:
+            row = await db.get(AllowedInvite, guild_id=guild_id)
             if row is not None:
                 return row
 
-        async for row in await db.stream(select(AllowedInvite)):  # type: AllowedInvite
-            if row.guild_name.lower().strip() == argument.lower().strip() or row.code == argument:
-                return row
-
         raise CommandError(t.allowed_server_not_found)
 
 
-@run_in_thread
-def get_discord_invite(url) -> Optional[str]:
-    if not re.match(r"^(https?://).*$", url):
-        url = "https://" + url
-    try:
-        url = requests.head(url, allow_redirects=True, timeout=10).url
-    except (KeyError, AttributeError, requests.RequestException, UnicodeError, ConnectionError, LocationParseError):
-        logger.info("URL could not be resolved: %s", url)
-        return None
-
-    if match := re.match(
-        r"^https?://discord\.com/(\.*/)*invite/(\.*/)*(?P<code>[a-zA-Z0-9\-]+).*$", url, re.IGNORECASE
-    ):
-        return match.group("code")
-
-    return None
-
-
-def find_urls(text):
-    return {
-        url
-        for pattern in [
-            r"((https?://)?([a-zA-Z0-9\-_~]+\.)+[a-zA-Z0-9\-_~.]+(\S*[a-zA-Z0-9])?)",
-            r"((https?://)?([a-zA-Z0-9\-_~]+\.)+[a-zA-Z0-9\-_~.]+\S*)",
-            r"((discord\.gg/|discord(app)?\.com/invite/)[a-zA-Z0-9]+)",
-        ]
-        for url, *_ in re.findall(pattern, text)
-    }
-
-
 class InvitesCog(Cog, name="Allowed Discord Invites"):
     CONTRIBUTORS = [
         Contributor.Defelo,
@@ -110,35 +65,35 @@ class InvitesCog(Cog, name="Allowed Discord Invites"):
 
         return out
 
+    async def on_ready(self):
+        await allowed_invites.load()
+
     async def check_message(self, message: Message) -> bool:
         author: Member = message.author
-        if message.guild is None or author.bot:
-            return True
-        if await InvitesPermission.bypass.check_permissions(author):
+        analysis = analyze(message)
+        if await analysis.is_exempt(InvitesPermission.bypass):
             return True
 
         forbidden = []
         legal_invite = False
-        for url in find_urls(message.content):
-            if (code := await get_discord_invite(url)) is None:
-                continue
-
-            try:
-                invite = await self.bot.fetch_invite(code)
-            except NotFound:
+        for code in await get_discord_invites(analysis.urls):
+            invite = await get_invite_info(self.bot, code)
+            if invite is None:
+                # invite lookups are currently rate limited, so the invite cannot be verified
+                forbidden.append(f"`{code}` (could not be verified, please try again later)")
                 continue
-            except Forbidden:
+            if invite.banned:
                 forbidden.append(f"`{code}` (banned from this server)")
                 continue
 
-            if invite.guild is None:
+            if invite.guild_id is None:
                 continue
-            if invite.guild == message.guild:
+            if invite.guild_id == message.guild.id:
                 legal_invite = True
                 continue
 
-            if await db.get(AllowedInvite, guild_id=invite.guild.id) is None:
-                forbidden.append(f"`{invite.code}` ({invite.guild.name})")
+            if not await allowed_invites.contains(invite.guild_id):
+                forbidden.append(f"`{invite.code}` ({invite.guild_name})")
             else:
                 legal_invite = True
 
@@ -182,12 +137,6 @@ class InvitesCog(Cog, name="Allowed Discord Invites"):
         if not await self.check_message(after):
             raise StopEventHandling
 
-    async def check_invite(self, url: str) -> Optional[Invite]:
-        try:
-            return await self.bot.fetch_invite(url)
-        except (NotFound, HTTPException):
-            return None
-
     @commands.group(aliases=["i"])
     @guild_only()
     async def invites(self, ctx: Context):
@@ -228,11 +177,11 @@ class InvitesCog(Cog, name="Allowed Discord Invites"):
         invite: AllowedInvite
         date = invite.created_at
         embed = Embed(title=t.allowed_server, color=Colors.Invites)
-        invite_guild = await self.check_invite(invite.code)
-        if invite_guild is not None:
+        invite_info = await get_invite_info(self.bot, invite.code, wait=True)
+        if invite_info is not None and invite_info.guild_id is not None:
             invite_title = t.invite_link
-            if invite_guild.guild.icon:
-                embed.set_thumbnail(url=invite_guild.guild.icon.url)
+            if invite_info.icon_url:
+                embed.set_thumbnail(url=invite_info.icon_url)
         else:
             invite_title = t.invite_link_expired
 
@@ -258,11 +207,12 @@ class InvitesCog(Cog, name="Allowed Discord Invites"):
             raise CommandError(t.invalid_invite)
 
         guild: Guild = invite.guild
-        if await db.get(AllowedInvite, guild_id=guild.id) is not None:
+        if await allowed_invites.contains(guild.id):
             raise CommandError(t.server_already_whitelisted)
 
         await AllowedInvite.create(guild.id, invite.code, guild.name, applicant.id, ctx.author.id)
         await InviteLog.create(guild.id, guild.name, applicant.id, ctx.author.id, True)
+        await invalidate_invites(guild.id, invite.code)
         embed = Embed(title=t.invites, description=t.server_whitelisted, color=Colors.Invites)
         await reply(ctx, embed=embed)
         await send_to_changelog(ctx.guild, t.log_server_whitelisted(guild.name))
@@ -295,6 +245,7 @@ class InvitesCog(Cog, name="Allowed Discord Invites"):
         if not await InvitesPermission.manage.check_permissions(ctx.author) and ctx.author.id != row.applicant:
             raise CommandError(tg.not_allowed)
 
+        await invalidate_invites(guild.id, row.code, invite.code)
         await AllowedInvite.update(guild.id, invite.code, guild.name)
         embed = Embed(title=t.invites, description=t.invite_updated(guild.name), color=Colors.Invites)
         await reply(ctx, embed=embed)
@@ -349,8 +300,9 @@ class InvitesCog(Cog, name="Allowed Discord Invites"):
         """
 
         server: AllowedInvite
-        await db.delete(server)
+        await server.remove()
         await InviteLog.create(server.guild_id, server.guild_name, server.applicant, ctx.author.id, False)
+        await invalidate_invites(server.guild_id, server.code)
         embed = Embed(title=t.invites, description=t.server_removed, color=Colors.Invites)
         await reply(ctx, embed=embed)
         await send_to_changelog(ctx.guild, t.log_server_removed(server.guild_name))
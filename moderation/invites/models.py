@@ -6,7 +6,78 @@ from typing import Optional, Union
 from discord.utils import utcnow
 from sqlalchemy import BigInteger, Boolean, Column, Integer, String, Text
 
-from PyDrocsid.database import Base, UTCDateTime, db
+from PyDrocsid.database import Base, UTCDateTime, db, select
+
+from ...write_behind import audit_queue
+
+
+class AllowedInviteIndex:
+    """
+    In-memory index of all allowed guilds by id, (lower-cased) name and invite code.
+    The index is loaded from the database on first access.
+    """
+
+    def __init__(self):
+        self.loaded: bool = False
+        self._names: dict[int, str] = {}
+        self._codes: dict[int, str] = {}
+        self._by_name: dict[str, int] = {}
+        self._by_code: dict[str, int] = {}
+
+    async def load(self):
+        """(Re)load the index from the database."""
+
+        # build the new index first, so lookups during the load still use the old one
+        index = AllowedInviteIndex()
+        async for row in await db.stream(select(AllowedInvite)):  # type: AllowedInvite
+            index._add(row.guild_id, row.guild_name, row.code)
+
+        self._names = index._names
+        self._codes = index._codes
+        self._by_name = index._by_name
+        self._by_code = index._by_code
+        self.loaded = True
+
+    async def _ensure_loaded(self):
+        if not self.loaded:
+            await self.load()
+
+    async def add(self, guild_id: int, guild_name: str, code: str):
+        await self._ensure_loaded()
+        self._add(guild_id, guild_name, code)
+
+    async def remove(self, guild_id: int):
+        await self._ensure_loaded()
+        self._remove(guild_id)
+
+    async def contains(self, guild_id: int) -> bool:
+        await self._ensure_loaded()
+        return guild_id in self._names
+
+    async def find(self, argument: str) -> Optional[int]:
+        """Return the id of the allowed guild with the given id, name or invite code."""
+
+        await self._ensure_loaded()
+        if argument.isnumeric() and int(argument) in self._names:
+            return int(argument)
+
+        return self._by_name.get(argument.lower().strip(), self._by_code.get(argument))
+
+    def _add(self, guild_id: int, guild_name: str, code: str):
+        self._remove(guild_id)
+        self._names[guild_id] = key = guild_name.lower().strip()
+        self._codes[guild_id] = code
+        self._by_name.setdefault(key, guild_id)
+        self._by_code.setdefault(code, guild_id)
+
+    def _remove(self, guild_id: int):
+        if (name := self._names.pop(guild_id, None)) is not None and self._by_name.get(name) == guild_id:
+            self._by_name.pop(name)
+        if (code := self._codes.pop(guild_id, None)) is not None and self._by_code.get(code) == guild_id:
+            self._by_code.pop(code)
+
+
+allowed_invites = AllowedInviteIndex()
 
 
 class AllowedInvite(Base):
@@ -32,6 +103,7 @@ class AllowedInvite(Base):
             created_at=utcnow(),
         )
         await db.add(row)
+        await allowed_invites.add(guild_id, guild_name, code)
         return row
 
     @staticmethod
@@ -39,6 +111,11 @@ class AllowedInvite(Base):
         row: AllowedInvite = await db.get(AllowedInvite, guild_id=guild_id)
         row.code = code
         row.guild_name = guild_name
+        await allowed_invites.add(guild_id, guild_name, code)
+
+    async def remove(self):
+        await db.delete(self)
+        await allowed_invites.remove(self.guild_id)
 
 
 class InviteLog(Base):
@@ -79,5 +156,4 @@ class IllegalInvitePost(Base):
     @staticmethod
     async def create(member: int, member_name: str, channel: int, name: str) -> IllegalInvitePost:
         row = IllegalInvitePost(member=member, member_name=member_name, timestamp=utcnow(), channel=channel, name=name)
-        await db.add(row)
-        return row
+        return audit_queue.add(row)
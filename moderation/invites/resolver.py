@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from typing import NamedTuple, Optional
+
+from aiohttp import ClientError, ClientTimeout
+from discord import Forbidden, HTTPException, NotFound
+from discord.ext.commands import Bot
+
+from PyDrocsid.logger import get_logger
+from PyDrocsid.redis import redis
+
+from ...http_client import gather_with_deadline, get_session
+
+
+logger = get_logger(__name__)
+
+# maximum time (in seconds) for resolving all urls of a message
+RESOLVE_DEADLINE = 10
+# maximum number of redirects to follow when resolving a url
+MAX_REDIRECTS = 5
+
+# time (in seconds) the invite code of a url is cached
+URL_CACHE_TTL = 24 * 60 * 60
+# time (in seconds) urls which do not point to a discord invite are cached (urls which could not be resolved are not)
+NEGATIVE_URL_CACHE_TTL = 60 * 60
+# time (in seconds) the guild of an invite code is cached
+INVITE_CACHE_TTL = 10 * 60
+# time (in seconds) invalid invite codes are cached
+NEGATIVE_INVITE_CACHE_TTL = 60
+# budget for invite lookups via the discord api (number of requests per time in seconds)
+INVITE_LOOKUP_RATE = 5
+INVITE_LOOKUP_PER = 5
+# maximum number of invite lookups which are queued when the budget is exhausted
+MAX_QUEUED_LOOKUPS = 100
+
+
+class InviteInfo(NamedTuple):
+    code: str
+    guild_id: Optional[int]
+    guild_name: Optional[str]
+    banned: bool
+    icon_url: Optional[str] = None
+
+    @property
+    def valid(self) -> bool:
+        return self.banned or self.guild_id is not None
+
+
+class ResolveError(Exception):
+    """A url could not be resolved."""
+
+
+async def get_discord_invite(url: str) -> Optional[str]:
+    """
+    Return the invite code a url points to or None if it does not point to a discord invite.
+
+    :raises ResolveError: if the url could not be resolved
+    """
+
+    if not re.match(r"^(https?://).*$", url):
+        url = "https://" + url
+    try:
+        async with get_session().head(
+            url, allow_redirects=True, max_redirects=MAX_REDIRECTS, timeout=ClientTimeout(total=RESOLVE_DEADLINE)
+        ) as response:
+            url = str(response.url)
+    except (ClientError, ValueError, UnicodeError, asyncio.TimeoutError):
+        raise ResolveError(url)
+
+    if match := re.match(
+        r"^https?://discord\.com/(\.*/)*invite/(\.*/)*(?P<code>[a-zA-Z0-9\-]+).*$", url, re.IGNORECASE
+    ):
+        return match.group("code")
+
+    return None
+
+
+async def resolve_url(url: str) -> Optional[str]:
+    """Resolve a url and cache the invite code it points to (or the absence of one)."""
+
+    try:
+        code = await get_discord_invite(url)
+    except ResolveError:
+        # failures (e.g. timeouts) are not cached, so the url is resolved again next time
+        logger.info("URL could not be resolved: %s", url)
+        return None
+
+    await redis.setex(f"invites:url={url}", URL_CACHE_TTL if code else NEGATIVE_URL_CACHE_TTL, code or "")
+    return code
+
+
+async def get_discord_invites(urls: set[str]) -> list[str]:
+    """Return the discord invite codes the given urls point to, resolving uncached urls concurrently."""
+
+    if not urls:
+        return []
+
+    urls = sorted(urls)
+    codes: set[str] = set()
+    missing: list[str] = []
+    for url, code in zip(urls, await redis.mget([f"invites:url={url}" for url in urls])):
+        if code is None:
+            missing.append(url)
+        elif code:
+            codes.add(code)
+
+    codes.update((await gather_with_deadline(resolve_url, missing, RESOLVE_DEADLINE)).values())
+    return sorted(codes)
+
+
+async def fetch_invite_info(bot: Bot, code: str) -> InviteInfo:
+    """Fetch the guild of an invite code (or whether the bot is banned from it) and update the cache."""
+
+    try:
+        invite = await bot.fetch_invite(code)
+    except NotFound:
+        info = InviteInfo(code, None, None, False, None)
+    except Forbidden:
+        info = InviteInfo(code, None, None, True, None)
+    else:
+        if (guild := invite.guild) is None:
+            info = InviteInfo(code, None, None, False, None)
+        else:
+            info = InviteInfo(invite.code, guild.id, guild.name, False, guild.icon and guild.icon.url)
+
+    async with redis.pipeline() as pipe:
+        ttl = INVITE_CACHE_TTL if info.valid else NEGATIVE_INVITE_CACHE_TTL
+        await pipe.setex(f"invites:code={code}", ttl, json.dumps(info[1:]))
+        if info.guild_id is not None:
+            await pipe.sadd(key := f"invites:guild={info.guild_id}:codes", code)
+            await pipe.expire(key, INVITE_CACHE_TTL)
+        await pipe.execute()
+
+    return info
+
+
+class InviteLookupScheduler:
+    """
+    Schedules invite lookups via the discord api.
+    Concurrent lookups of the same code share a single request and requests are limited to a budget of `rate`
+    requests per `per` seconds, so invite spam does not run into the rate limit of the invite endpoint.
+    """
+
+    def __init__(self, rate: int, per: float, max_queued: int):
+        self._rate: int = rate
+        self._per: float = per
+        self._max_queued: int = max_queued
+        self._tokens: float = rate
+        self._updated: float = time.monotonic()
+        self._pending: dict[str, asyncio.Task] = {}
+        self._queued: set[str] = set()
+
+    def _take(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self._rate, self._tokens + (now - self._updated) * self._rate / self._per)
+        self._updated = now
+        if self._tokens < 1:
+            return False
+
+        self._tokens -= 1
+        return True
+
+    async def _lookup(self, bot: Bot, code: str, queued: bool) -> Optional[InviteInfo]:
+        try:
+            while queued and not self._take():
+                await asyncio.sleep((1 - self._tokens) * self._per / self._rate)
+            self._queued.discard(code)
+
+            return await fetch_invite_info(bot, code)
+        except HTTPException as e:
+            if e.status == 429:
+                self._tokens = 0
+            logger.warning("Could not look up invite %s: %s", code, e)
+            return None
+        finally:
+            self._queued.discard(code)
+            self._pending.pop(code, None)
+
+    async def lookup(self, bot: Bot, code: str, wait: bool = False) -> Optional[InviteInfo]:
+        """
+        Look up an invite code. If the budget is exhausted, the lookup is queued (if the queue is not full) and None
+        is returned immediately (unless wait is set), so the result is available in the cache later.
+        """
+
+        if (task := self._pending.get(code)) is None:
+            queued = not self._take()
+            if queued and len(self._queued) >= self._max_queued and not wait:
+                return None
+
+            task = self._pending[code] = asyncio.create_task(self._lookup(bot, code, queued))
+            if queued:
+                self._queued.add(code)
+
+        if code in self._queued and not wait:
+            return None
+
+        return await asyncio.shield(task)
+
+
+invite_lookups = InviteLookupScheduler(INVITE_LOOKUP_RATE, INVITE_LOOKUP_PER, MAX_QUEUED_LOOKUPS)
+
+
+async def get_invite_info(bot: Bot, code: str, wait: bool = False) -> Optional[InviteInfo]:
+    """
+    Return the guild of an invite code (or whether the bot is banned from it), using the cache if possible.
+    Return None if the invite could not be looked up (yet), see InviteLookupScheduler.lookup.
+    """
+
+    if cached := await redis.get(f"invites:code={code}"):
+        return InviteInfo(code, *json.loads(cached))
+
+    return await invite_lookups.lookup(bot, code, wait)
+
+
+async def invalidate_invites(guild_id: int, *codes: str):
+    """Remove all cached invite codes of a guild (and the given invite codes) from the cache."""
+
+    codes = {*codes, *await redis.smembers(key := f"invites:guild={guild_id}:codes")}
+    await redis.delete(key, *[f"invites:code={code}" for code in codes])
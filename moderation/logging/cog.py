@@ -1,8 +1,7 @@
-import json
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Optional, Union
 
-from discord import Embed, Forbidden, Guild, Member, Message, RawMessageDeleteEvent, TextChannel
+from discord import Embed, Guild, HTTPException, Member, Message, NotFound, Object, RawMessageDeleteEvent, TextChannel
 from discord.ext import commands, tasks
 from discord.ext.commands import Command, CommandError, Context, Group, UserInputError, guild_only
 from discord.utils import utcnow
@@ -15,14 +14,18 @@ from PyDrocsid.environment import CACHE_TTL
 from PyDrocsid.logger import get_logger
 from PyDrocsid.redis import redis
 from PyDrocsid.translations import t
-from PyDrocsid.util import calculate_edit_distance, check_message_send_permissions
+from PyDrocsid.util import check_message_send_permissions
 
 from .colors import Colors
+from .delivery import log_delivery
+from .message_store import StoredMessage, message_store
 from .models import LogExclude
 from .permissions import LoggingPermission
 from .settings import LoggingSettings
 from ...contributor import Contributor
+from ...edit_distance import bounded_edit_distance
 from ...pubsub import can_respond_on_reaction, ignore_message_delete, ignore_message_edit, send_alert, send_to_changelog
+from ...write_behind import audit_queue
 
 
 logger = get_logger(__name__)
@@ -30,6 +33,11 @@ logger = get_logger(__name__)
 tg = t.g
 t = t.logging
 
+# maximum number of messages deleted per channel in each run of the cleanup loop
+CLEANUP_BUDGET = 1000
+# maximum number of messages deleted with a single request (discord limit)
+BULK_DELETE_SIZE = 100
+
 
 def add_field(embed: Embed, name: str, text: str):
     first = True
@@ -39,24 +47,27 @@ def add_field(embed: Embed, name: str, text: str):
         first = False
 
 
-async def send_to_channel(guild: Guild, setting: LoggingSettings, message: Union[str, Embed]):
-    msg = json.dumps(message.to_dict()) if isinstance(message, Embed) else message
-    channel: Optional[TextChannel] = guild.get_channel(await setting.get())
-    if not channel:
-        logger.warning(f"Could not send message to {setting.name}: {msg}")
-        return
-
+def send_to_channel(guild: Guild, setting: LoggingSettings, message: Union[str, Embed]):
     if isinstance(message, str):
         embed = Embed(colour=Colors.changelog, description=message)
     else:
         embed = message
 
-    try:
-        await channel.send(embed=embed)
-    except Forbidden:
-        logger.warning(f"Could not send message to {setting.name}: {msg}")
-    else:
-        logger.info(f"{setting.name}: {msg}")
+    log_delivery.add(guild, setting, embed)
+
+
+def add_attachments_field(embed: Embed, attachments: list[tuple[str, str, int]]):
+    if not attachments:
+        return
+
+    out = []
+    for filename, url, size in attachments:
+        for _unit in "BKMG":
+            if size < 1000:
+                break
+            size /= 1000
+        out.append(f"[{filename}]({url}) ({size:.1f} {_unit})")
+    embed.add_field(name=t.attachments, value="\n".join(out), inline=False)
 
 
 async def is_logging_channel(channel: TextChannel) -> bool:
@@ -67,6 +78,47 @@ async def is_logging_channel(channel: TextChannel) -> bool:
     return False
 
 
+async def cleanup_channel(channel: TextChannel, timestamp: datetime):
+    """
+    Delete up to CLEANUP_BUDGET messages older than the given timestamp from a channel.
+    The id of the last deleted message is stored, so the next run continues after it.
+    """
+
+    checkpoint: Optional[str] = await redis.get(key := f"logging_cleanup:channel={channel.id}")
+    after = Object(id=int(checkpoint)) if checkpoint else None
+    # messages older than 14 days cannot be deleted in bulk
+    bulk_limit = utcnow() - timedelta(days=14) + timedelta(minutes=5)
+    # bulk deletion requires the manage_messages permission, but the bot can always delete its own messages
+    bulk = channel.permissions_for(channel.guild.me).manage_messages
+
+    batch: list[Message] = []
+
+    async def delete_batch():
+        if batch:
+            await channel.delete_messages(batch)
+            await redis.set(key, batch[-1].id)
+            batch.clear()
+
+    async for message in channel.history(limit=CLEANUP_BUDGET, after=after, oldest_first=True):  # type: Message
+        if message.created_at > timestamp:
+            break
+
+        if bulk and message.created_at > bulk_limit:
+            batch.append(message)
+            if len(batch) >= BULK_DELETE_SIZE:
+                await delete_batch()
+            continue
+
+        await delete_batch()
+        try:
+            await message.delete()
+        except NotFound:
+            pass
+        await redis.set(key, message.id)
+
+    await delete_batch()
+
+
 channels: list[str] = []
 
 
@@ -113,11 +165,11 @@ class LoggingCog(Cog, name="Logging"):
 
     @send_to_changelog.subscribe
     async def handle_send_to_changelog(self, guild: Guild, message: Union[str, Embed]):
-        await send_to_channel(guild, LoggingSettings.changelog_channel, message)
+        send_to_channel(guild, LoggingSettings.changelog_channel, message)
 
     @send_alert.subscribe
     async def handle_send_alert(self, guild: Guild, message: Union[str, Embed]):
-        await send_to_channel(guild, LoggingSettings.alert_channel, message)
+        send_to_channel(guild, LoggingSettings.alert_channel, message)
 
     @can_respond_on_reaction.subscribe
     async def handle_can_respond_on_reaction(self, channel: TextChannel) -> bool:
@@ -160,20 +212,24 @@ class LoggingCog(Cog, name="Logging"):
             if channel is None:
                 continue
 
-            async for message in channel.history(limit=None, oldest_first=True):  # type: Message
-                if message.created_at > timestamp:
-                    break
+            try:
+                await cleanup_channel(channel, timestamp)
+            except HTTPException:
+                logger.exception("Could not clean up %s", setting.name)
 
-                await message.delete()
+    async def on_message(self, message: Message):
+        if message.guild is not None:
+            await message_store.add(message)
 
     async def on_message_edit(self, before: Message, after: Message):
         if before.guild is None:
             return
+        await message_store.add(after)
         if await redis.delete(f"ignore_message_edit:{before.channel.id}:{before.id}"):
             return
         mindiff: int = await LoggingSettings.edit_mindiff.get()
         old_message = await redis.get(key := f"little_diff_message_edit:{before.id}") or before.content
-        if calculate_edit_distance(old_message, after.content) < mindiff:
+        if bounded_edit_distance(old_message, after.content, mindiff) < mindiff:
             if not await redis.exists(key):
                 await redis.setex(key, 60 * 60 * 24, before.content)
             return
@@ -196,6 +252,8 @@ class LoggingCog(Cog, name="Logging"):
     async def on_raw_message_edit(self, channel: TextChannel, message: Message):
         if message.guild is None:
             return
+        stored: Optional[StoredMessage] = await message_store.get(message.id)
+        await message_store.add(message)
         if await redis.delete(f"ignore_message_edit:{channel.id}:{message.id}"):
             return
         if (edit_channel := await self.get_logging_channel(LoggingSettings.edit_channel)) is None:
@@ -211,12 +269,15 @@ class LoggingCog(Cog, name="Logging"):
             embed.add_field(name=t.author_id, value=message.author.id)
             embed.add_field(name=t.message_id, value=message.id)
             embed.add_field(name=t.url, value=message.jump_url, inline=False)
+            if stored is not None:
+                add_field(embed, t.old_content, stored.content)
             add_field(embed, t.new_content, message.content)
         await edit_channel.send(embed=embed)
 
     async def on_message_delete(self, message: Message):
         if message.guild is None:
             return
+        await message_store.remove(message.id)
         if await redis.delete(f"ignore_message_delete:{message.channel.id}:{message.id}"):
             return
         if (delete_channel := await self.get_logging_channel(LoggingSettings.delete_channel)) is None:
@@ -234,21 +295,15 @@ class LoggingCog(Cog, name="Logging"):
         embed.add_field(name=t.author_id, value=message.author.id)
         embed.add_field(name=t.message_id, value=message.id)
         add_field(embed, t.old_content, message.content)
-        if message.attachments:
-            out = []
-            for attachment in message.attachments:
-                size = attachment.size
-                for _unit in "BKMG":
-                    if size < 1000:
-                        break
-                    size /= 1000
-                out.append(f"[{attachment.filename}]({attachment.url}) ({size:.1f} {_unit})")
-            embed.add_field(name=t.attachments, value="\n".join(out), inline=False)
+        add_attachments_field(
+            embed, [(attachment.filename, attachment.url, attachment.size) for attachment in message.attachments]
+        )
         await delete_channel.send(embed=embed)
 
     async def on_raw_message_delete(self, event: RawMessageDeleteEvent):
         if event.guild_id is None:
             return
+        stored: Optional[StoredMessage] = await message_store.remove(event.message_id)
         if await redis.delete(f"ignore_message_delete:{event.channel_id}:{event.message_id}"):
             return
         if (delete_channel := await self.get_logging_channel(LoggingSettings.delete_channel)) is None:
@@ -264,6 +319,14 @@ class LoggingCog(Cog, name="Logging"):
                 return
 
             embed.add_field(name=t.channel, value=channel.mention)
+        if stored is not None:
+            embed.set_author(name=stored.author_name, icon_url=stored.author_avatar)
+            embed.add_field(name=t.author, value=f"<@{stored.author_id}>")
+            embed.add_field(name=t.author_id, value=stored.author_id)
+            embed.add_field(name=t.message_id, value=event.message_id)
+            add_field(embed, t.old_content, stored.content)
+            add_attachments_field(embed, stored.attachments)
+        elif channel is not None:
             embed.add_field(name=t.message_id, value=event.message_id, inline=False)
         await delete_channel.send(embed=embed)
 
@@ -309,6 +372,17 @@ class LoggingCog(Cog, name="Logging"):
                 mindist: int = await LoggingSettings.edit_mindiff.get()
                 embed.add_field(name=t.channels.edit.mindist.name, value=str(mindist), inline=True)
 
+        embed.add_field(
+            name=t.delivery,
+            value=t.delivery_stats(log_delivery.depth, log_delivery.sent, log_delivery.dropped),
+            inline=False,
+        )
+        embed.add_field(
+            name=t.audit_queue,
+            value=t.audit_queue_stats(audit_queue.depth, audit_queue.inserted, audit_queue.dropped),
+            inline=False,
+        )
+
         await reply(ctx, embed=embed)
 
     @logging.command(name="maxage", aliases=["ma"])
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import deque
+from typing import Optional
+
+from discord import Embed, Guild, HTTPException, TextChannel
+
+from PyDrocsid.database import db_context
+from PyDrocsid.logger import get_logger
+from PyDrocsid.translations import t
+
+from .settings import LoggingSettings
+
+
+logger = get_logger(__name__)
+
+t = t.logging
+
+# maximum number of embeds per message (discord limit)
+BATCH_SIZE = 10
+# maximum total length of all embeds of a message (discord limit)
+MAX_BATCH_LENGTH = 6000
+# maximum time (in seconds) an event is delayed to be sent together with subsequent events
+FLUSH_INTERVAL = 2
+# maximum number of events queued per channel, further events are suppressed until the queue has been flushed
+MAX_QUEUED = 5 * BATCH_SIZE
+
+
+class ChannelQueue:
+    def __init__(self, guild: Guild, setting: LoggingSettings):
+        self.guild: Guild = guild
+        self.setting: LoggingSettings = setting
+        self.embeds: deque[Embed] = deque()
+        self.suppressed: int = 0
+        self.full: asyncio.Event = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class LogDelivery:
+    """
+    Delivers events to log channels (e.g. alerts and changelog).
+    Events are queued per channel and sent in batches of up to BATCH_SIZE embeds per message, either when a batch is
+    full or after FLUSH_INTERVAL seconds and when the delivery task is cancelled on shutdown. If a queue overflows, the
+    additional events are dropped and summarized in the next message.
+    """
+
+    def __init__(self):
+        self._queues: dict[tuple[int, str], ChannelQueue] = {}
+        # total number of events which have been sent
+        self.sent: int = 0
+        # total number of events which have been dropped because a queue was full
+        self.dropped: int = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of events waiting to be sent."""
+
+        return sum(len(queue.embeds) for queue in self._queues.values())
+
+    def add(self, guild: Guild, setting: LoggingSettings, embed: Embed):
+        """Queue an event for the log channel of the given setting."""
+
+        if (queue := self._queues.get(key := (guild.id, setting.name))) is None:
+            queue = self._queues[key] = ChannelQueue(guild, setting)
+
+        if len(queue.embeds) >= MAX_QUEUED:
+            queue.suppressed += 1
+            self.dropped += 1
+            logger.warning("%s: event suppressed: %s", setting.name, json.dumps(embed.to_dict()))
+            return
+
+        queue.embeds.append(embed)
+        if len(queue.embeds) >= BATCH_SIZE:
+            queue.full.set()
+        if queue.task is None:
+            queue.task = asyncio.create_task(self._deliver(queue))
+
+    async def _deliver(self, queue: ChannelQueue):
+        try:
+            while queue.embeds:
+                if len(queue.embeds) < BATCH_SIZE:
+                    try:
+                        await asyncio.wait_for(queue.full.wait(), FLUSH_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+
+                queue.full.clear()
+                await self._try_send_batch(queue)
+        except asyncio.CancelledError:
+            # deliver all queued events before shutting down
+            while queue.embeds:
+                await self._try_send_batch(queue)
+            raise
+        finally:
+            queue.task = None
+
+    async def _try_send_batch(self, queue: ChannelQueue):
+        try:
+            await self._send_batch(queue)
+        except Exception:
+            logger.exception("Could not deliver events to %s", queue.setting.name)
+
+    async def _send_batch(self, queue: ChannelQueue):
+        batch: list[Embed] = []
+        length = 0
+        while queue.embeds and len(batch) < BATCH_SIZE and length + len(queue.embeds[0]) <= MAX_BATCH_LENGTH:
+            length += len(embed := queue.embeds.popleft())
+            batch.append(embed)
+        if not batch:
+            # a single embed which is too long can't be sent together with other embeds
+            batch.append(queue.embeds.popleft())
+
+        suppressed, queue.suppressed = queue.suppressed, 0
+        content = t.events_suppressed(cnt=suppressed) if suppressed else None
+
+        msg = json.dumps([embed.to_dict() for embed in batch])
+        async with db_context():
+            channel: Optional[TextChannel] = queue.guild.get_channel(await queue.setting.get())
+        if not channel:
+            logger.warning(f"Could not send message to {queue.setting.name} ({suppressed} events suppressed): {msg}")
+            return
+
+        try:
+            await channel.send(content=content, embeds=batch)
+        except HTTPException:
+            logger.warning(f"Could not send message to {queue.setting.name} ({suppressed} events suppressed): {msg}")
+        else:
+            self.sent += len(batch)
+            logger.info(f"{queue.setting.name}: {msg}")
+
+
+log_delivery = LogDelivery()
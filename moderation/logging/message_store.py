@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+from os import getenv
+from threading import Lock
+from typing import Optional
+
+from discord import Message
+
+from PyDrocsid.async_thread import run_in_thread
+from PyDrocsid.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# maximum number of messages kept in memory
+MAX_MESSAGES = 20000
+# time (in seconds) after which a message is removed from the store
+MESSAGE_TTL = 24 * 60 * 60
+# optional sqlite database to which messages are moved when they are evicted from memory
+SPILL_PATH: Optional[str] = getenv("MESSAGE_STORE_PATH") or None
+# minimum time (in seconds) between two removals of expired messages from the sqlite database
+SPILL_PRUNE_INTERVAL = 10 * 60
+
+
+class StoredMessage:
+    """Compact copy of a message, which is needed to log edits and deletions of uncached messages."""
+
+    __slots__ = ("id", "channel_id", "author_id", "author_name", "author_avatar", "_content", "attachments", "expires")
+
+    def __init__(
+        self,
+        message_id: int,
+        channel_id: int,
+        author_id: int,
+        author_name: str,
+        author_avatar: str,
+        content: str | bytes,
+        attachments: list[tuple[str, str, int]],
+        expires: float,
+    ):
+        self.id: int = message_id
+        self.channel_id: int = channel_id
+        self.author_id: int = author_id
+        self.author_name: str = author_name
+        self.author_avatar: str = author_avatar
+        self._content: bytes = zlib.compress(content.encode()) if isinstance(content, str) else content
+        # filename, url and size of all attachments
+        self.attachments: list[tuple[str, str, int]] = attachments
+        self.expires: float = expires
+
+    @staticmethod
+    def from_message(message: Message) -> StoredMessage:
+        return StoredMessage(
+            message.id,
+            message.channel.id,
+            message.author.id,
+            str(message.author),
+            message.author.display_avatar.url,
+            message.content,
+            [(attachment.filename, attachment.url, attachment.size) for attachment in message.attachments],
+            time.time() + MESSAGE_TTL,
+        )
+
+    @property
+    def content(self) -> str:
+        return zlib.decompress(self._content).decode()
+
+    def serialize(self) -> bytes:
+        data = [self.channel_id, self.author_id, self.author_name, self.author_avatar, self.attachments]
+        return zlib.compress(json.dumps(data).encode()) + self._content
+
+    @staticmethod
+    def deserialize(message_id: int, data: bytes, expires: float) -> StoredMessage:
+        # the compressed metadata is followed by the compressed content
+        obj = zlib.decompressobj()
+        channel_id, author_id, author_name, author_avatar, attachments = json.loads(obj.decompress(data))
+        return StoredMessage(
+            message_id,
+            channel_id,
+            author_id,
+            author_name,
+            author_avatar,
+            obj.unused_data,
+            [tuple(attachment) for attachment in attachments],
+            expires,
+        )
+
+
+class SpillFile:
+    """Sqlite database for messages which have been evicted from memory."""
+
+    def __init__(self, path: str):
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "create table if not exists messages (id integer primary key, expires real, data blob)"
+        )
+        self._connection.execute("create index if not exists messages_expires on messages (expires)")
+        self._next_prune: float = 0
+
+    @run_in_thread
+    def put(self, messages: list[StoredMessage]):
+        with self._lock, self._connection:
+            if time.monotonic() >= self._next_prune:
+                self._connection.execute("delete from messages where expires < ?", (time.time(),))
+                self._next_prune = time.monotonic() + SPILL_PRUNE_INTERVAL
+
+            self._connection.executemany(
+                "insert or replace into messages values (?, ?, ?)",
+                [(message.id, message.expires, message.serialize()) for message in messages],
+            )
+
+    @run_in_thread
+    def pop(self, message_id: int) -> Optional[StoredMessage]:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "select data, expires from messages where id = ? and expires >= ?", (message_id, time.time())
+            ).fetchone()
+            self._connection.execute("delete from messages where id = ?", (message_id,))
+
+        return row and StoredMessage.deserialize(message_id, *row)
+
+
+class MessageStore:
+    """
+    Bounded store of recent messages.
+    Messages are evicted after MESSAGE_TTL seconds or, if more than MAX_MESSAGES messages are stored, in least
+    recently used order. Evicted messages are moved to a sqlite database if MESSAGE_STORE_PATH is set.
+    """
+
+    def __init__(self, max_messages: int, spill_path: Optional[str]):
+        self._max_messages: int = max_messages
+        self._messages: OrderedDict[int, StoredMessage] = OrderedDict()
+        self._spill: Optional[SpillFile] = SpillFile(spill_path) if spill_path else None
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    async def add(self, message: Message):
+        """Store a new message or update the stored copy of an edited message."""
+
+        self._messages[message.id] = StoredMessage.from_message(message)
+        self._messages.move_to_end(message.id)
+        await self._evict()
+
+    async def get(self, message_id: int) -> Optional[StoredMessage]:
+        """Return the stored copy of a message."""
+
+        if (message := self._messages.get(message_id)) is None and self._spill:
+            try:
+                message = await self._spill.pop(message_id)
+            except sqlite3.Error:
+                logger.exception("Could not read message %s from the message store", message_id)
+            if message is not None:
+                # the message is moved back into memory (as the most recently used one), so another message may
+                # have to be evicted
+                self._messages[message_id] = message
+                await self._evict()
+                return message
+
+        if message is None or message.expires < time.time():
+            return None
+
+        self._messages.move_to_end(message_id)
+        return message
+
+    async def remove(self, message_id: int) -> Optional[StoredMessage]:
+        """Remove a message from the store and return it."""
+
+        message = await self.get(message_id)
+        self._messages.pop(message_id, None)
+        return message
+
+    async def _evict(self):
+        messages = self._messages
+        now = time.time()
+        evicted = []
+        while messages and (len(messages) > self._max_messages or next(iter(messages.values())).expires < now):
+            _, message = messages.popitem(last=False)
+            if message.expires >= now:
+                evicted.append(message)
+
+        if evicted and self._spill:
+            try:
+                await self._spill.put(evicted)
+            except sqlite3.Error:
+                logger.exception("Could not move %s messages to the message store", len(evicted))
+
+
+message_store = MessageStore(MAX_MESSAGES, SPILL_PATH)
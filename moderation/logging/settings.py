@@ -1,7 +1,7 @@
-from PyDrocsid.settings import Settings
+from ...settings_cache import SnapshotSettings
 
 
-class LoggingSettings(Settings):
+class LoggingSettings(SnapshotSettings):
     maxage = -1
     edit_mindiff = 1
 
@@ -1,8 +1,6 @@
-import re
 from datetime import datetime
 from typing import Optional
 
-from aiohttp import ClientError, ClientSession
 from discord import Embed, Forbidden, Guild, Message, TextChannel
 from discord.ext import commands
 from discord.ext.commands import CommandError, Context, UserInputError, guild_only
@@ -15,9 +13,11 @@ from PyDrocsid.events import StopEventHandling
 from PyDrocsid.translations import t
 
 from .colors import Colors
+from .detection import contains_image
 from .models import MediaOnlyChannel, MediaOnlyDeletion
 from .permissions import MediaOnlyPermission
 from ...contributor import Contributor
+from ...message_analysis import analyze
 from ...pubsub import can_respond_on_reaction, get_userlog_entries, send_alert, send_to_changelog
 
 
@@ -25,23 +25,6 @@ tg = t.g
 t = t.mediaonly
 
 
-async def contains_image(message: Message) -> bool:
-    urls = [(att.url,) for att in message.attachments]
-    urls += re.findall(r"(https?://([a-zA-Z0-9\-_~]+\.)+[a-zA-Z0-9\-_~]+(/\S*)?)", message.content)
-    for url, *_ in urls:
-        try:
-            async with ClientSession() as session, session.head(url, allow_redirects=True) as response:
-                content_length = int(response.headers["Content-length"])
-                mime = response.headers["Content-type"]
-        except (KeyError, AttributeError, UnicodeError, ConnectionError, ClientError):
-            break
-
-        if mime.startswith("image/") and content_length >= 256:
-            return True
-
-    return False
-
-
 async def delete_message(message: Message):
     try:
         await message.delete()
@@ -64,10 +47,10 @@ async def delete_message(message: Message):
 async def check_message(message: Message):
     if message.guild is None or message.author.bot:
         return
-    if await MediaOnlyPermission.bypass.check_permissions(message.author):
-        return
     if not await MediaOnlyChannel.exists(message.channel.id):
         return
+    if await analyze(message).bypasses(MediaOnlyPermission.bypass):
+        return
     if await contains_image(message):
         return
 
@@ -80,7 +63,7 @@ class MediaOnlyCog(Cog, name="MediaOnly"):
 
     @can_respond_on_reaction.subscribe
     async def handle_can_respond_on_reaction(self, channel: TextChannel) -> bool:
-        return not await db.exists(filter_by(MediaOnlyChannel, channel=channel.id))
+        return not await MediaOnlyChannel.exists(channel.id)
 
     @get_userlog_entries.subscribe
     async def handle_get_userlog_entries(self, user_id: int, _) -> list[tuple[datetime, str]]:
@@ -92,6 +75,9 @@ class MediaOnlyCog(Cog, name="MediaOnly"):
 
         return out
 
+    async def on_ready(self):
+        await MediaOnlyChannel.load()
+
     async def on_message(self, message: Message):
         await check_message(message)
 
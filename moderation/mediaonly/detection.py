@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Optional
+
+from aiohttp import ClientError
+from discord import Attachment, Message
+
+from PyDrocsid.redis import redis
+
+from ...http_client import gather_with_deadline, get_session
+from ...message_analysis import analyze
+
+
+# minimum size (in bytes) of an image
+MIN_CONTENT_LENGTH = 256
+# maximum time (in seconds) for checking all urls of a message
+CHECK_DEADLINE = 10
+# time (in seconds) the content type and length of a url are cached
+URL_CACHE_TTL = 24 * 60 * 60
+
+
+def is_image(mime: Optional[str], content_length: Optional[int]) -> bool:
+    return bool(mime and mime.startswith("image/") and content_length and content_length >= MIN_CONTENT_LENGTH)
+
+
+async def fetch_media_info(url: str) -> Optional[tuple[str, int]]:
+    """Send a HEAD request to a url and return its content type and length or None if the request failed."""
+
+    try:
+        async with get_session().head(url, allow_redirects=True) as response:
+            return response.headers["Content-type"], int(response.headers["Content-length"])
+    except (KeyError, ValueError, UnicodeError, ConnectionError, ClientError, asyncio.TimeoutError):
+        return None
+
+
+async def get_media_info(url: str) -> Optional[tuple[str, int]]:
+    """Return the (cached) content type and length of a url."""
+
+    if cached := await redis.get(key := f"mediaonly:url={url}"):
+        return tuple(json.loads(cached))
+
+    # failed requests (e.g. timeouts or connection errors) may be transient, so only actual responses are cached
+    if info := await fetch_media_info(url):
+        await redis.setex(key, URL_CACHE_TTL, json.dumps(info))
+    return info
+
+
+def attachment_is_image(attachment: Attachment) -> Optional[bool]:
+    """Return whether an attachment is an image according to its metadata or None if discord did not provide any."""
+
+    if attachment.content_type is None:
+        return None
+
+    return is_image(attachment.content_type, attachment.size)
+
+
+async def contains_image(message: Message) -> bool:
+    """Return whether a message contains an image, either as an attachment or as a link."""
+
+    urls = []
+    for attachment in message.attachments:
+        if (result := attachment_is_image(attachment)) is None:
+            urls.append(attachment.url)
+        elif result:
+            return True
+
+    urls += analyze(message).http_urls
+    results = await gather_with_deadline(get_media_info, urls, CHECK_DEADLINE)
+    return any(is_image(*info) for info in results.values())
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import AsyncIterable, Union
+from typing import AsyncIterable, Optional, Union
 
 from discord.utils import utcnow
 from sqlalchemy import BigInteger, Column, Integer, Text
 
-from PyDrocsid.database import Base, UTCDateTime, db, delete, filter_by, select
-from PyDrocsid.environment import CACHE_TTL
-from PyDrocsid.redis import redis
+from PyDrocsid.database import Base, UTCDateTime, db, delete, select
+
+from ...write_behind import audit_queue
+
+
+# ids of all mediaonly channels, loaded from the database on first access
+_channels: Optional[set[int]] = None
 
 
 class MediaOnlyChannel(Base):
@@ -16,34 +20,35 @@ class MediaOnlyChannel(Base):
 
     channel: Union[Column, int] = Column(BigInteger, primary_key=True, unique=True)
 
+    @staticmethod
+    async def load() -> set[int]:
+        global _channels
+
+        _channels = {row.channel async for row in await db.stream(select(MediaOnlyChannel))}
+        return _channels
+
+    @staticmethod
+    async def channels() -> set[int]:
+        return _channels if _channels is not None else await MediaOnlyChannel.load()
+
     @staticmethod
     async def add(channel: int):
-        await redis.setex(f"mediaonly:channel={channel}", CACHE_TTL, 1)
         await db.add(MediaOnlyChannel(channel=channel))
+        (await MediaOnlyChannel.channels()).add(channel)
 
     @staticmethod
     async def exists(channel: int) -> bool:
-        if result := await redis.get(key := f"mediaonly:channel={channel}"):
-            return result == "1"
-
-        result = await db.exists(filter_by(MediaOnlyChannel, channel=channel))
-        await redis.setex(key, CACHE_TTL, int(result))
-        return result
+        return channel in (await MediaOnlyChannel.channels())
 
     @staticmethod
     async def stream() -> AsyncIterable[int]:
-        row: MediaOnlyChannel
-        async with redis.pipeline() as pipe:
-            async for row in await db.stream(select(MediaOnlyChannel)):
-                channel = row.channel
-                await pipe.setex(f"mediaonly:channel={channel}", CACHE_TTL, 1)
-                yield channel
-            await pipe.execute()
+        for channel in sorted(await MediaOnlyChannel.channels()):
+            yield channel
 
     @staticmethod
     async def remove(channel: int):
-        await redis.setex(f"mediaonly:channel={channel}", CACHE_TTL, 0)
         await db.exec(delete(MediaOnlyChannel).filter_by(channel=channel))
+        (await MediaOnlyChannel.channels()).discard(channel)
 
 
 class MediaOnlyDeletion(Base):
@@ -58,5 +63,4 @@ class MediaOnlyDeletion(Base):
     @staticmethod
     async def create(member: int, member_name: str, channel: int) -> MediaOnlyDeletion:
         row = MediaOnlyDeletion(member=member, member_name=member_name, timestamp=utcnow(), channel=channel)
-        await db.add(row)
-        return row
+        return audit_queue.add(row)
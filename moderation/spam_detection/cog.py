@@ -1,24 +1,29 @@
-import time
-
-from discord import Embed, Member, VoiceState
+from discord import Embed, Member, Message, VoiceState
 from discord.ext import commands
-from discord.ext.commands import Context, UserInputError, guild_only
+from discord.ext.commands import CommandError, Context, UserInputError, guild_only
 
 from PyDrocsid.cog import Cog
 from PyDrocsid.command import reply
 from PyDrocsid.config import Contributor
-from PyDrocsid.redis import redis
 from PyDrocsid.translations import t
 
 from .colors import Colors
 from .permissions import SpamDetectionPermission
 from .settings import SpamDetectionSettings
+from .tracker import BUFFER_SIZE, DUPLICATE_WINDOW, MENTION_WINDOW, MESSAGE_WINDOW, MessageTracker
+from ...message_analysis import analyze
 from ...pubsub import send_alert, send_to_changelog
+from ...rate_limit import SlidingWindow
 
 
 tg = t.g
 t = t.spam_detection
 
+# channel hops within the last minute, at most one alert every 10 seconds
+channel_hops = SlidingWindow("channel_hops", 60, 10)
+
+message_tracker = MessageTracker()
+
 
 class SpamDetectionCog(Cog, name="Spam Detection"):
     CONTRIBUTORS = [Contributor.ce_phox, Contributor.Defelo]
@@ -35,20 +40,10 @@ class SpamDetectionCog(Cog, name="Spam Detection"):
         if max_hops <= 0:
             return
 
-        ts = time.time()
-        await redis.zremrangebyscore(key := f"channel_hops:user={member.id}", min="-inf", max=ts - 60)
-        await redis.zadd(key, {str(ts): ts})
-        await redis.expire(key, 60)
-        hops: int = await redis.zcount(key, "-inf", "inf")
-
-        if hops <= max_hops:
+        hops, alert = await channel_hops.hit(f"user={member.id}", max_hops)
+        if not alert:
             return
 
-        if await redis.exists(key := f"channel_hops_alert_sent:user={member.id}"):
-            return
-
-        await redis.setex(key, 10, 1)
-
         embed = Embed(title=t.channel_hopping, color=Colors.SpamDetection, description=t.hops_in_last_minute(cnt=hops))
         embed.add_field(name=tg.member, value=member.mention)
         embed.add_field(name=t.member_id, value=member.id)
@@ -58,6 +53,53 @@ class SpamDetectionCog(Cog, name="Spam Detection"):
 
         await send_alert(member.guild, embed)
 
+    async def on_message(self, message: Message):
+        """
+        Checks for message floods, duplicate messages and mention spam
+        """
+
+        if message.guild is None or message.author.bot:
+            return
+
+        mentions = len(message.raw_mentions) + len(message.raw_role_mentions) + message.mention_everyone
+        stats = message_tracker.record(message.author.id, analyze(message).normalized_text.strip(), mentions)
+
+        for detector, count, setting, window in [
+            ("messages", stats.messages, SpamDetectionSettings.max_messages, MESSAGE_WINDOW),
+            ("duplicates", stats.duplicates, SpamDetectionSettings.max_duplicates, DUPLICATE_WINDOW),
+            ("mentions", stats.mentions, SpamDetectionSettings.max_mentions, MENTION_WINDOW),
+        ]:
+            # limits are at least 1, so there is no need to look them up for the first event
+            if count <= 1:
+                continue
+
+            max_count: int = await setting.get()
+            if max_count <= 0 or count <= max_count:
+                continue
+            if not message_tracker.should_alert(message.author.id, detector):
+                continue
+            if await analyze(message).bypasses(SpamDetectionPermission.bypass):
+                continue
+
+            await self.send_message_spam_alert(message, detector, count, window)
+
+    async def send_message_spam_alert(self, message: Message, detector: str, count: int, window: int):
+        title, description = {
+            "messages": (t.message_spam, t.messages_in_last_seconds),
+            "duplicates": (t.duplicate_spam, t.duplicates_in_last_seconds),
+            "mentions": (t.mention_spam, t.mentions_in_last_seconds),
+        }[detector]
+
+        member: Member = message.author
+        embed = Embed(title=title, color=Colors.SpamDetection, description=description(window, cnt=count))
+        embed.add_field(name=tg.member, value=member.mention)
+        embed.add_field(name=t.member_id, value=member.id)
+        embed.add_field(name=t.channel, value=message.channel.mention)
+        embed.add_field(name=t.message, value=f"[{t.jump_to_message}]({message.jump_url})")
+        embed.set_author(name=str(member), icon_url=member.display_avatar.url)
+
+        await send_alert(message.guild, embed)
+
     @commands.group(aliases=["spam", "sd"])
     @SpamDetectionPermission.read.check
     @guild_only()
@@ -78,6 +120,16 @@ class SpamDetectionCog(Cog, name="Spam Detection"):
         else:
             embed.add_field(name=t.channel_hopping, value=t.max_x_hops(cnt=max_hops))
 
+        for title, setting, max_x, window in [
+            (t.message_spam, SpamDetectionSettings.max_messages, t.max_x_messages, MESSAGE_WINDOW),
+            (t.duplicate_spam, SpamDetectionSettings.max_duplicates, t.max_x_duplicates, DUPLICATE_WINDOW),
+            (t.mention_spam, SpamDetectionSettings.max_mentions, t.max_x_mentions, MENTION_WINDOW),
+        ]:
+            if (amount := await setting.get()) <= 0:
+                embed.add_field(name=title, value=tg.disabled)
+            else:
+                embed.add_field(name=title, value=max_x(window, cnt=amount))
+
         await reply(ctx, embed=embed)
 
     @spam_detection.command(name="hops", aliases=["h"])
@@ -96,3 +148,75 @@ class SpamDetectionCog(Cog, name="Spam Detection"):
         )
         await reply(ctx, embed=embed)
         await send_to_changelog(ctx.guild, t.hop_amount_set(amount) if amount > 0 else t.hop_detection_disabled)
+
+    async def set_message_limit(
+        self,
+        ctx: Context,
+        setting: SpamDetectionSettings,
+        amount: int,
+        window: int,
+        title: str,
+        amount_set,
+        disabled: str,
+    ):
+        if not 0 <= amount < BUFFER_SIZE:
+            raise CommandError(t.invalid_amount(BUFFER_SIZE - 1))
+
+        await setting.set(amount)
+        message = amount_set(window, amount) if amount > 0 else disabled
+        await reply(ctx, embed=Embed(title=title, description=message, colour=Colors.SpamDetection))
+        await send_to_changelog(ctx.guild, message)
+
+    @spam_detection.command(name="messages", aliases=["m"])
+    @SpamDetectionPermission.write.check
+    async def spam_detection_messages(self, ctx: Context, amount: int):
+        """
+        Changes the number of maximum messages per 10 seconds allowed before an alert is issued
+        set this to 0 to disable message spam alerts
+        """
+
+        await self.set_message_limit(
+            ctx,
+            SpamDetectionSettings.max_messages,
+            amount,
+            MESSAGE_WINDOW,
+            t.message_spam,
+            t.message_amount_set,
+            t.message_detection_disabled,
+        )
+
+    @spam_detection.command(name="duplicates", aliases=["d"])
+    @SpamDetectionPermission.write.check
+    async def spam_detection_duplicates(self, ctx: Context, amount: int):
+        """
+        Changes the number of maximum identical messages per minute allowed before an alert is issued
+        set this to 0 to disable duplicate message alerts
+        """
+
+        await self.set_message_limit(
+            ctx,
+            SpamDetectionSettings.max_duplicates,
+            amount,
+            DUPLICATE_WINDOW,
+            t.duplicate_spam,
+            t.duplicate_amount_set,
+            t.duplicate_detection_disabled,
+        )
+
+    @spam_detection.command(name="mentions", aliases=["mention"])
+    @SpamDetectionPermission.write.check
+    async def spam_detection_mentions(self, ctx: Context, amount: int):
+        """
+        Changes the number of maximum mentions per minute allowed before an alert is issued
+        set this to 0 to disable mention spam alerts
+        """
+
+        await self.set_message_limit(
+            ctx,
+            SpamDetectionSettings.max_mentions,
+            amount,
+            MENTION_WINDOW,
+            t.mention_spam,
+            t.mention_amount_set,
+            t.mention_detection_disabled,
+        )
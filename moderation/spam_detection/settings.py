@@ -1,5 +1,8 @@
-from PyDrocsid.settings import Settings
+from ...settings_cache import SnapshotSettings
 
 
-class SpamDetectionSettings(Settings):
+class SpamDetectionSettings(SnapshotSettings):
     max_hops = 0
+    max_messages = 0
+    max_duplicates = 0
+    max_mentions = 0
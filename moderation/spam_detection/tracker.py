@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict, deque
+from typing import NamedTuple, Optional
+
+
+# time windows (in seconds) of the message spam detectors
+MESSAGE_WINDOW = 10
+DUPLICATE_WINDOW = 60
+MENTION_WINDOW = 60
+# maximum number of events stored per user and detector, higher limits cannot be detected
+BUFFER_SIZE = 64
+# minimum time (in seconds) between two alerts of the same detector for the same user
+ALERT_COOLDOWN = 60
+# time (in seconds) after which the activity of an idle user is discarded
+IDLE_TIMEOUT = max(MESSAGE_WINDOW, DUPLICATE_WINDOW, MENTION_WINDOW)
+
+
+class EventWindow:
+    """Ring buffer of weighted events within a sliding time window, which keeps the total weight of its events."""
+
+    __slots__ = ("window", "events", "total")
+
+    def __init__(self, window: float):
+        self.window: float = window
+        self.events: deque[tuple[float, int]] = deque()
+        self.total: int = 0
+
+    def add(self, timestamp: float, weight: int = 1) -> int:
+        """Record an event and return the total weight of all events within the window."""
+
+        events = self.events
+        while events and (events[0][0] <= timestamp - self.window or len(events) >= BUFFER_SIZE):
+            self.total -= events.popleft()[1]
+
+        events.append((timestamp, weight))
+        self.total += weight
+        return self.total
+
+
+class DuplicateWindow:
+    """Ring buffer of content hashes within a sliding time window, which counts the occurrences of each hash."""
+
+    __slots__ = ("window", "events", "counts")
+
+    def __init__(self, window: float):
+        self.window: float = window
+        self.events: deque[tuple[float, int]] = deque()
+        self.counts: dict[int, int] = {}
+
+    def add(self, timestamp: float, content_hash: int) -> int:
+        """Record a message and return how often its content occurred within the window."""
+
+        events, counts = self.events, self.counts
+        while events and (events[0][0] <= timestamp - self.window or len(events) >= BUFFER_SIZE):
+            _, old = events.popleft()
+            if (count := counts[old] - 1) > 0:
+                counts[old] = count
+            else:
+                del counts[old]
+
+        events.append((timestamp, content_hash))
+        counts[content_hash] = count = counts.get(content_hash, 0) + 1
+        return count
+
+
+class UserActivity:
+    __slots__ = ("last_seen", "messages", "duplicates", "mentions", "alerts")
+
+    def __init__(self):
+        self.last_seen: float = 0
+        self.messages: EventWindow = EventWindow(MESSAGE_WINDOW)
+        self.duplicates: DuplicateWindow = DuplicateWindow(DUPLICATE_WINDOW)
+        self.mentions: EventWindow = EventWindow(MENTION_WINDOW)
+        self.alerts: dict[str, float] = {}
+
+
+class MessageStats(NamedTuple):
+    # number of messages within MESSAGE_WINDOW
+    messages: int
+    # number of messages with the same content within DUPLICATE_WINDOW (across all channels)
+    duplicates: int
+    # number of mentions within MENTION_WINDOW
+    mentions: int
+
+
+class MessageTracker:
+    """
+    Tracks the recent messages of all active users in memory.
+    Recording a message takes constant (amortized) time, users are discarded after IDLE_TIMEOUT seconds of inactivity.
+    """
+
+    def __init__(self):
+        # ordered by last activity, so idle users can be evicted from the front
+        self._users: OrderedDict[int, UserActivity] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _evict(self, now: float):
+        users = self._users
+        while users and next(iter(users.values())).last_seen <= now - IDLE_TIMEOUT:
+            users.popitem(last=False)
+
+    def record(self, user_id: int, content: Optional[str], mentions: int) -> MessageStats:
+        """Record a message of a user and return the current statistics of this user."""
+
+        now = time.monotonic()
+        self._evict(now)
+
+        if (activity := self._users.get(user_id)) is None:
+            activity = self._users[user_id] = UserActivity()
+        else:
+            self._users.move_to_end(user_id)
+        activity.last_seen = now
+
+        return MessageStats(
+            activity.messages.add(now),
+            activity.duplicates.add(now, hash(content)) if content else 0,
+            activity.mentions.add(now, mentions) if mentions else 0,
+        )
+
+    def should_alert(self, user_id: int, detector: str) -> bool:
+        """Return whether an alert should be sent for the given user and detector and start the alert cooldown."""
+
+        if (activity := self._users.get(user_id)) is None:
+            return False
+
+        now = time.monotonic()
+        if (last_alert := activity.alerts.get(detector)) is not None and last_alert > now - ALERT_COOLDOWN:
+            return False
+
+        activity.alerts[detector] = now
+        return True
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import time
+from typing import NamedTuple
+
+from PyDrocsid.redis import redis
+
+
+# KEYS: sorted set of events, alert cooldown key
+# ARGV: timestamp, window (in seconds), limit, alert cooldown (in seconds)
+SLIDING_WINDOW_SCRIPT = redis.register_script(
+    """
+local now, window, limit, cooldown = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now - window)
+redis.call("ZADD", KEYS[1], now, ARGV[1])
+redis.call("EXPIRE", KEYS[1], math.ceil(window))
+local count = redis.call("ZCARD", KEYS[1])
+local alert = 0
+if count > limit and redis.call("SET", KEYS[2], 1, "EX", cooldown, "NX") then
+    alert = 1
+end
+return {count, alert}
+"""
+)
+
+
+class WindowState(NamedTuple):
+    # number of events in the window (including the new one)
+    count: int
+    # whether the limit is exceeded and no alert has been sent within the cooldown
+    alert: bool
+
+
+class SlidingWindow:
+    """
+    Sliding window rate limiter backed by redis.
+    Recording an event, counting the events in the window and checking the alert cooldown take a single round trip.
+    """
+
+    def __init__(self, name: str, window: int, cooldown: int):
+        self.name: str = name
+        self.window: int = window
+        self.cooldown: int = cooldown
+
+    async def hit(self, key: str | int, limit: int) -> WindowState:
+        """Record an event for the given key and return the new state of its window."""
+
+        count, alert = await SLIDING_WINDOW_SCRIPT(
+            keys=[f"{self.name}:{key}", f"{self.name}_alert_sent:{key}"],
+            args=[time.time(), self.window, limit, self.cooldown],
+        )
+        return WindowState(count, bool(alert))
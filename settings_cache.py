@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Optional
+
+from PyDrocsid.logger import get_logger
+from PyDrocsid.redis import redis
+from PyDrocsid.settings import Settings, Value
+
+
+logger = get_logger(__name__)
+
+# redis pub/sub channel on which changed settings are announced to all processes
+INVALIDATION_CHANNEL = "settings:invalidate"
+# maximum time (in seconds) a setting is kept in the snapshot, in case an invalidation message is lost
+SNAPSHOT_TTL = 10 * 60
+# time (in seconds) to wait before resubscribing to the invalidation channel after an error
+RECONNECT_DELAY = 5
+
+# fullname -> (expiry, value)
+_snapshot: dict[str, tuple[float, Value]] = {}
+# incremented on every invalidation, so values read before an invalidation are not stored afterwards
+_generation: int = 0
+_subscribed: bool = False
+_listener: Optional[asyncio.Task] = None
+
+
+def invalidate(fullname: Optional[str] = None):
+    """Remove a setting (or all settings) from the snapshot."""
+
+    global _generation
+
+    _generation += 1
+    if fullname is None:
+        _snapshot.clear()
+    else:
+        _snapshot.pop(fullname, None)
+
+
+async def _listen():
+    global _subscribed
+
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # invalidation messages may have been missed while not subscribed
+                invalidate()
+                _subscribed = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        invalidate(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Settings invalidation channel failed, resubscribing")
+        finally:
+            _subscribed = False
+            invalidate()
+
+        await asyncio.sleep(RECONNECT_DELAY)
+
+
+def _ensure_listener():
+    global _listener
+
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(_listen())
+
+
+class SnapshotSettings(Settings):
+    """
+    Settings which are kept in a process-local snapshot after they have been read once.
+    Changes are announced via redis pub/sub, so the snapshots of all processes are invalidated. The snapshot is only
+    used while the process is subscribed to the invalidation channel.
+    """
+
+    async def get(self) -> Value:
+        """Get the value of this setting."""
+
+        _ensure_listener()
+        if (entry := _snapshot.get(self.fullname)) is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        generation = _generation
+        value = await super().get()
+        if _subscribed and generation == _generation:
+            _snapshot[self.fullname] = time.monotonic() + SNAPSHOT_TTL, value
+
+        return value
+
+    async def set(self, value: Value) -> Value:
+        """Set the value of this setting."""
+
+        await super().set(value)
+        invalidate(self.fullname)
+        await redis.publish(INVALIDATION_CHANNEL, self.fullname)
+        return value
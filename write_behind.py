@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Optional, TypeVar
+
+from sqlalchemy import Table, insert
+
+from PyDrocsid.database import Base, db, db_context
+from PyDrocsid.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+T = TypeVar("T", bound=Base)
+
+# number of queued rows which triggers an immediate flush (and maximum number of rows per INSERT statement)
+BATCH_SIZE = 500
+# maximum time (in seconds) a row stays in the queue
+FLUSH_INTERVAL = 5
+# maximum number of queued rows, additional rows are dropped (e.g. during a database outage)
+MAX_QUEUE_SIZE = 50_000
+# number of failed batch inserts after which the rows are inserted one by one, dropping the rows which fail
+MAX_RETRIES = 3
+
+
+def row_values(row: Base) -> dict[str, Any]:
+    """Return the column values of a row, omitting unset primary keys (e.g. autoincrement ids)."""
+
+    return {
+        column.key: value
+        for column in row.__table__.columns
+        if (value := getattr(row, column.key)) is not None or not column.primary_key
+    }
+
+
+class WriteBehindQueue:
+    """
+    Queue for append-only rows (e.g. moderation audit logs), which are inserted in batches by a background task.
+    The queue is flushed when it is full, after the flush interval and when the background task is cancelled on
+    shutdown. If inserting a batch fails repeatedly (or on shutdown), the rows are inserted one by one, so a single
+    invalid row can't block the queue.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_size: int, max_retries: int):
+        self._batch_size: int = batch_size
+        self._flush_interval: float = flush_interval
+        self._max_size: int = max_size
+        self._max_retries: int = max_retries
+        self._rows: list[Base] = []
+        self._failures: int = 0
+        self._full: asyncio.Event = asyncio.Event()
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.inserted: int = 0
+        self.dropped: int = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of rows waiting to be inserted."""
+
+        return len(self._rows)
+
+    def add(self, row: T) -> T:
+        """Queue a new row for insertion and return immediately."""
+
+        if len(self._rows) >= self._max_size:
+            self.dropped += 1
+            logger.warning("Write behind queue is full, dropping row: %s", row_values(row))
+            return row
+
+        self._rows.append(row)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if len(self._rows) >= self._batch_size:
+            self._full.set()
+
+        return row
+
+    async def flush(self):
+        """Insert all queued rows now."""
+
+        # use a separate task, so the database session of the caller is not replaced
+        await asyncio.create_task(self._flush())
+
+    async def _run(self):
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self._flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+                self._full.clear()
+                await self._flush()
+        except asyncio.CancelledError:
+            await self._flush(final=True)
+            raise
+
+    async def _flush(self, final: bool = False):
+        async with self._lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return
+
+            tables: dict[Table, list[dict[str, Any]]] = {}
+            for row in rows:
+                tables.setdefault(row.__table__, []).append(row_values(row))
+
+            size = self._batch_size
+            try:
+                async with db_context():
+                    for table, values in tables.items():
+                        while values:
+                            batch, values = values[:size], values[size:]
+                            await db.exec(insert(table).values(batch))
+            except Exception:
+                self._failures += 1
+                if not final and self._failures < self._max_retries:
+                    logger.exception("Could not insert %s queued rows, retrying later", len(rows))
+                    self._rows[:0] = rows
+                    return
+
+                logger.exception("Could not insert %s queued rows, inserting them one by one", len(rows))
+                self._failures = 0
+                await self._insert_each(tables)
+                return
+            except BaseException:
+                self._rows[:0] = rows
+                raise
+
+            self._failures = 0
+            self.inserted += len(rows)
+            logger.debug("Inserted %s queued rows, %s remaining", len(rows), self.depth)
+
+    async def _insert_each(self, tables: dict[Table, list[dict[str, Any]]]):
+        for table, values in tables.items():
+            for value in values:
+                try:
+                    async with db_context():
+                        await db.exec(insert(table).values(value))
+                except Exception:
+                    self.dropped += 1
+                    logger.exception("Could not insert row into %s, dropping it: %s", table.name, value)
+                else:
+                    self.inserted += 1
+
+
+audit_queue = WriteBehindQueue(BATCH_SIZE, FLUSH_INTERVAL, MAX_QUEUE_SIZE, MAX_RETRIES)